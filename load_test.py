@@ -0,0 +1,363 @@
+"""Load-testing harness: start one ``streamlit run`` server and drive N concurrent sessions against it.
+
+Every session is a websocket client speaking Streamlit's own protocol, like a browser tab:
+it sends a rerun with the widget values it changed and waits until the script run finishes
+(following any ``st.rerun()``). All sessions share the one server process, with its caches,
+render thread pools and GIL, which is what a deployment sees. Run it from the repository root:
+
+    python load_test.py --sessions 8 --iterations 3
+    python load_test.py --sessions 16 --skip-pdf --json load-report.json
+
+The report has p50/p95/p99 latency per step and overall, plus the CPU time and RSS of the
+server process (PDF worker processes, when CV_PDF_WORKER_PROCESSES is set, are not included).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.websocket import websocket_connect
+
+NAV_WIDGET_KEY = "main_navigation"
+EDITOR_VIEW = "Data Editor"
+PREVIEW_VIEW = "CV Generator"
+BUILDER_VIEW = "CV Builder"
+RUN_TIMEOUT_SECONDS = 120
+SERVER_START_TIMEOUT_SECONDS = 60
+
+Widget = Tuple[str, Any]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def process_rss(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def process_cpu_seconds(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/stat") as file:
+            # Fields after the parenthesised command name; utime and stime are the 12th and 13th.
+            fields = file.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class StreamlitServer:
+    """``streamlit run`` in a child process, with its RSS sampled while the test runs."""
+
+    def __init__(self, script: str, port: int, log_path: Optional[str] = None) -> None:
+        self.script = script
+        self.port = port
+        self.log_path = log_path
+        self.process: Optional[subprocess.Popen] = None
+        self.rss_start = 0
+        self.rss_peak = 0
+        self._done = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_rss, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}/_stcore/stream"
+
+    def start(self) -> None:
+        log = open(self.log_path, "w") if self.log_path else subprocess.DEVNULL
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "streamlit", "run", self.script,
+                "--server.headless=true",
+                f"--server.port={self.port}",
+                "--server.fileWatcherType=none",
+                "--browser.gatherUsageStats=false",
+            ],
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        deadline = time.monotonic() + SERVER_START_TIMEOUT_SECONDS
+        while True:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"streamlit exited with code {self.process.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{self.port}/_stcore/health", timeout=1):
+                    break
+            except OSError:
+                if time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError("streamlit did not become healthy in time")
+                time.sleep(0.2)
+        self.rss_start = self.rss_peak = process_rss(self.process.pid)
+        self._sampler.start()
+
+    def _sample_rss(self) -> None:
+        while not self._done.wait(0.1):
+            self.rss_peak = max(self.rss_peak, process_rss(self.process.pid))
+
+    def cpu_seconds(self) -> float:
+        return process_cpu_seconds(self.process.pid) if self.process else 0.0
+
+    def rss(self) -> int:
+        return process_rss(self.process.pid) if self.process else 0
+
+    def stop(self) -> None:
+        self._done.set()
+        if self._sampler.is_alive():
+            self._sampler.join()
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+
+class SessionDriver:
+    """One simulated browser tab going through a realistic editing flow."""
+
+    def __init__(self, url: str, session_id: int, think_time: float, generate_pdf: bool) -> None:
+        self.url = url
+        self.session_id = session_id
+        self.think_time = think_time
+        self.generate_pdf = generate_pdf
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: List[str] = []
+        self.connection: Any = None
+        self.page_script_hash = ""
+        self.widgets: Dict[str, Widget] = {}
+        # Large messages are sent once, then referenced by hash (the browser keeps them too).
+        self._message_cache: Dict[str, ForwardMsg] = {}
+        self._step_name = ""
+
+    async def _run_script(self, states: List[WidgetState]) -> None:
+        msg = BackMsg()
+        msg.rerun_script.page_script_hash = self.page_script_hash
+        msg.rerun_script.widget_states.widgets.extend(states)
+        await self.connection.write_message(msg.SerializeToString(), binary=True)
+        while True:
+            payload = await asyncio.wait_for(self.connection.read_message(), RUN_TIMEOUT_SECONDS)
+            if payload is None:
+                raise ConnectionError("the server closed the websocket")
+            forward = ForwardMsg()
+            forward.ParseFromString(payload)
+            if forward.WhichOneof("type") == "ref_hash":
+                forward = self._message_cache[forward.ref_hash]
+            elif forward.hash:
+                self._message_cache[forward.hash] = forward
+
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                self.page_script_hash = forward.new_session.page_script_hash
+                self.widgets = {}
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                self._collect(forward.delta.new_element)
+            elif kind == "script_finished" and forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return
+
+    def _collect(self, element: Any) -> None:
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            self.errors.append(f"{self._step_name}: {element.exception.message}")
+            return
+        widget = getattr(element, kind)
+        widget_id = getattr(widget, "id", "")
+        if widget_id:
+            self.widgets[widget_id] = (kind, widget)
+
+    def _keyed(self, key: str) -> Optional[Widget]:
+        # Widget ids end with the user key ("$$WIDGET_ID-<hash>-<key>").
+        return next((widget for widget_id, widget in self.widgets.items() if widget_id.endswith(f"-{key}")), None)
+
+    def _button(self, predicate: Any) -> Optional[WidgetState]:
+        widget = next(
+            (widget for kind, widget in self.widgets.values() if kind == "button" and predicate(widget.label)),
+            None,
+        )
+        return WidgetState(id=widget.id, trigger_value=True) if widget is not None else None
+
+    async def _step(self, name: str, *states: WidgetState) -> None:
+        self._step_name = name
+        start = time.perf_counter()
+        await self._run_script(list(states))
+        self.latencies.setdefault(name, []).append(time.perf_counter() - start)
+        if self.think_time:
+            await asyncio.sleep(random.uniform(0, self.think_time))
+
+    async def _navigate(self, name: str, view: str) -> None:
+        menu = self._keyed(NAV_WIDGET_KEY)
+        if menu is None:
+            raise LookupError("navigation menu not found")
+        await self._step(name, WidgetState(id=menu[1].id, json_value=json.dumps(view)))
+
+    async def start(self) -> None:
+        self.connection = await websocket_connect(self.url)
+        await self._step("initial_load")
+        await self._navigate("open_preview", PREVIEW_VIEW)
+        load_example = self._button(lambda label: label == "Load Example Data")
+        if load_example is not None:
+            await self._step("load_example", load_example)
+
+    async def iterate(self, iteration: int) -> None:
+        await self._navigate("open_editor", EDITOR_VIEW)
+        highlights = self._keyed("textarea_exp_highlights_0")
+        if highlights is not None:
+            widget = highlights[1]
+            value = widget.value if widget.set_value else widget.default
+            await self._step("edit_experience", WidgetState(
+                id=widget.id,
+                string_value=f"{value}\nSession {self.session_id} iteration {iteration} highlight",
+            ))
+
+        await self._navigate("open_preview", PREVIEW_VIEW)
+        include = self._keyed("include_experience")
+        if include is not None:
+            checked = include[1].value if include[1].set_value else include[1].default
+            await self._step("toggle_section", WidgetState(id=include[1].id, bool_value=not checked))
+            await self._step("toggle_section", WidgetState(id=include[1].id, bool_value=checked))
+        pdf_button = self._button(lambda label: label == "Generate PDF")
+        if self.generate_pdf and pdf_button is not None:
+            await self._step("generate_pdf", pdf_button)
+
+        await self._navigate("open_builder", BUILDER_VIEW)
+        add_button = self._button(lambda label: label.startswith("➕"))
+        if add_button is not None:
+            await self._step("builder_add_item", add_button)
+
+    async def run(self, iterations: int) -> None:
+        try:
+            await self.start()
+            for iteration in range(iterations):
+                await self.iterate(iteration)
+        except Exception as exc:
+            self.errors.append(f"driver: {type(exc).__name__}: {exc}")
+        finally:
+            if self.connection is not None:
+                self.connection.close()
+
+
+async def _drive(drivers: List[SessionDriver], iterations: int) -> None:
+    await asyncio.gather(*(driver.run(iterations) for driver in drivers))
+
+
+def run_load_test(
+    script: str,
+    sessions: int,
+    iterations: int,
+    think_time: float,
+    generate_pdf: bool,
+    port: Optional[int] = None,
+    server_log: Optional[str] = None,
+) -> Dict[str, Any]:
+    server = StreamlitServer(script, port or free_port(), server_log)
+    server.start()
+    try:
+        drivers = [SessionDriver(server.url, idx, think_time, generate_pdf) for idx in range(sessions)]
+        cpu_start = server.cpu_seconds()
+        start_wall = time.perf_counter()
+        asyncio.run(_drive(drivers, iterations))
+        wall = time.perf_counter() - start_wall
+        cpu_seconds = server.cpu_seconds() - cpu_start
+        rss_end = server.rss()
+    finally:
+        server.stop()
+
+    steps: Dict[str, List[float]] = {}
+    for driver in drivers:
+        for name, values in driver.latencies.items():
+            steps.setdefault(name, []).extend(values)
+    everything = [value for values in steps.values() for value in values]
+
+    def summary(values: List[float]) -> Dict[str, float]:
+        return {
+            "count": len(values),
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "max_ms": max(values, default=0.0) * 1000,
+        }
+
+    return {
+        "sessions": sessions,
+        "iterations": iterations,
+        "wall_seconds": wall,
+        "reruns_per_second": len(everything) / wall if wall else 0.0,
+        "cpu_seconds": cpu_seconds,
+        "cpu_utilization": cpu_seconds / wall if wall else 0.0,
+        "server_rss_start_mb": server.rss_start / 2**20,
+        "server_rss_peak_mb": max(server.rss_peak, rss_end) / 2**20,
+        "server_rss_end_mb": rss_end / 2**20,
+        "overall": summary(everything),
+        "steps": {name: summary(values) for name, values in sorted(steps.items())},
+        "errors": [error for driver in drivers for error in driver.errors],
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"{report['sessions']} sessions x {report['iterations']} iterations in {report['wall_seconds']:.1f}s "
+          f"({report['reruns_per_second']:.1f} reruns/s)")
+    print(f"server CPU {report['cpu_seconds']:.1f}s ({report['cpu_utilization']:.0%} of one core), "
+          f"RSS {report['server_rss_start_mb']:.0f} MB at start, {report['server_rss_peak_mb']:.0f} MB peak, "
+          f"{report['server_rss_end_mb']:.0f} MB at end")
+    print(f"{'step':<20}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    rows = list(report["steps"].items()) + [("overall", report["overall"])]
+    for name, stats in rows:
+        print(f"{name:<20}{stats['count']:>7}{stats['p50_ms']:>10.0f}{stats['p95_ms']:>10.0f}"
+              f"{stats['p99_ms']:>10.0f}{stats['max_ms']:>10.0f}")
+    if report["errors"]:
+        print(f"{len(report['errors'])} errors, first: {report['errors'][0]}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate concurrent CV Builder sessions against one Streamlit server")
+    parser.add_argument("--script", default="main.py", help="Streamlit entry point to serve")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=2, help="edit/preview/builder rounds per session")
+    parser.add_argument("--think-time", type=float, default=0.0, help="max random pause between steps, seconds")
+    parser.add_argument("--skip-pdf", action="store_true", help="leave out the Generate PDF step")
+    parser.add_argument("--port", type=int, help="port for the server (a free one by default)")
+    parser.add_argument("--server-log", help="write the server's output to this file")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    # Paths in the app are relative to the repository root.
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    report = run_load_test(
+        args.script, args.sessions, args.iterations, args.think_time, not args.skip_pdf, args.port, args.server_log,
+    )
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
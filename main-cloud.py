@@ -9,8 +9,11 @@ from streamlit_option_menu import option_menu
 import io
 import base64
 import yaml
-from ui.__init__cloud__ import render_cv_preview, render_data_editor, render_cv_builder, EditorCallbacks, PreviewCallbacks
-from utils.yaml_utils import load_example_data, dump_yaml_to_string, load_yaml_from_file
+from ui.__init__cloud__ import render_cv_preview, render_data_editor, render_cv_builder, EditorCallbacks, PreviewCallbacks, start_warmup
+from utils.hashing import content_hash
+from utils.instrumentation import increment
+from utils.profiler import profiled
+from utils.yaml_utils import load_example_data, dump_yaml_to_string, is_data_empty, load_yaml_from_file
 
 APP_TITLE = "CV Builder"
 PAGE_ICON = "📄"
@@ -18,6 +21,7 @@ NAV_KEY = "view_mode"
 DATA_KEY = "cv_data"
 EXAMPLE_KEY = "example_data"
 FEEDBACK_KEY = "app_feedback"
+YAML_DOWNLOAD_KEY = "yaml_download"
 DEFAULT_VIEW = "Data Editor"
 PREVIEW_VIEW = "CV Generator"
 CV_BUILDER_VIEW = "CV Builder"
@@ -115,31 +119,28 @@ def handle_load_example() -> None:
     st.session_state[DATA_KEY] = copy.deepcopy(st.session_state.get(EXAMPLE_KEY, {}))
     push_feedback("info", "Example data loaded.")
 
+def cv_data_yaml() -> str:
+    """YAML for the download button, serialized again only when the CV data changed."""
+
+    data = st.session_state.get(DATA_KEY, {})
+    digest = content_hash(data)
+    cached: Optional[Tuple[str, str]] = st.session_state.get(YAML_DOWNLOAD_KEY)
+    if cached and cached[0] == digest:
+        increment("yaml_download.reused")
+        return cached[1]
+
+    # Empty data (every field blank) downloads the example instead
+    source = st.session_state.get(EXAMPLE_KEY, {}) if is_data_empty(data) else data
+    yaml_str = dump_yaml_to_string(source)
+    st.session_state[YAML_DOWNLOAD_KEY] = (digest, yaml_str)
+    increment("yaml_download.serialized")
+    return yaml_str
+
 def handle_download() -> None:
     """Download current CV data as YAML file."""
-    data = st.session_state.get(DATA_KEY, {})
-    # Consider data empty if all fields are empty or lists are empty
-    def is_data_empty(data):
-        if not data:
-            return True
-        for k, v in data.items():
-            if isinstance(v, dict):
-                if not is_data_empty(v):
-                    return False
-            elif isinstance(v, list):
-                if any(v):
-                    return False
-            elif v not in ("", None):
-                return False
-        return True
-
-    if is_data_empty(data):
-        data = copy.deepcopy(st.session_state.get(EXAMPLE_KEY, {}))
-
-    yaml_str = dump_yaml_to_string(data)
     st.download_button(
         label="Download CV Data",
-        data=yaml_str,
+        data=cv_data_yaml(),
         file_name="cv_data.yaml",
         mime="application/x-yaml",
         use_container_width=True
@@ -197,10 +198,12 @@ def render_tab_navigation() -> None:
     if selected_view != st.session_state[NAV_KEY]:
         handle_change_view(selected_view)
 
+@profiled("rerun")
 def main() -> None:
     """Application entry point."""
 
     configure_page()
+    start_warmup()
     ensure_session_state()
     display_feedback()
     st.markdown("## " + APP_TITLE, unsafe_allow_html=True)
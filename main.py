@@ -6,7 +6,8 @@ from typing import Optional, Tuple
 import streamlit as st
 from streamlit_option_menu import option_menu
 
-from ui import EditorCallbacks, PreviewCallbacks, render_cv_preview, render_data_editor, render_cv_builder
+from ui import EditorCallbacks, PreviewCallbacks, render_cv_preview, render_data_editor, render_cv_builder, start_warmup
+from utils.profiler import profiled
 from utils.yaml_utils import load_example_data, load_user_data, save_user_data
 
 APP_TITLE = "CV Builder"
@@ -151,10 +152,12 @@ def render_tab_navigation() -> None:
     if selected_view != st.session_state[NAV_KEY]:
         handle_change_view(selected_view)
 
+@profiled("rerun")
 def main() -> None:
     """Application entry point."""
 
     configure_page()
+    start_warmup()
     ensure_session_state()
     display_feedback()
     st.markdown("## " + APP_TITLE, unsafe_allow_html=True)
@@ -0,0 +1,396 @@
+"""Standalone HTTP service that renders CVs without going through the Streamlit UI.
+
+Run it from the repository root:
+
+    python render_service.py --port 8601 --workers 2 --queue-size 16
+
+Endpoints:
+    POST /render/html   body: {"template": "Clean", "data": {...}} (JSON or YAML), streamed back
+    POST /render/pdf    same body, returns application/pdf (?profile=final, compact or draft)
+    GET  /healthz       liveness and queue state
+    GET  /metrics       instrumentation snapshot as JSON
+    GET  /artifacts/<key>?filename=cv.pdf
+                        stored PDF/HTML, written straight from the memory-mapped file
+"""
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import yaml
+
+from ui.pdf_generator import DEFAULT_PROFILE, RENDER_PROFILES, render_pdf
+from ui.templates import find_template, render_html, stream_html_cv
+from utils.artifact_store import ARTIFACT_KEY_PATTERN, get_artifact_store
+from utils.instrumentation import increment, set_gauge, snapshot, timed
+
+logger = logging.getLogger("render_service")
+
+DEFAULT_TEMPLATE = "Standard"
+MAX_BODY_BYTES = 2 * 1024 * 1024
+JOB_TIMEOUT_SECONDS = 60
+# Streamed HTML chunks a render may produce ahead of the client (about 16 KB each):
+# a CV usually fits, so the render slot is freed before a slow client has read it.
+STREAM_QUEUE_CHUNKS = 32
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class StreamAbortedError(Exception):
+    pass
+
+
+class RenderQueue:
+    """Bounded job queue drained by a fixed number of worker threads."""
+
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self._jobs: "queue.Queue[Tuple[Future, Callable[[], Any]]]" = queue.Queue(maxsize=max_pending)
+        self._active = 0
+        self._active_lock = threading.Lock()
+        for idx in range(workers):
+            threading.Thread(target=self._work, name=f"render-worker-{idx}", daemon=True).start()
+
+    @property
+    def pending(self) -> int:
+        return self._jobs.qsize()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def submit(self, job: Callable[[], Any]) -> Future:
+        future: Future = Future()
+        try:
+            self._jobs.put_nowait((future, job))
+        except queue.Full:
+            increment("service.rejected")
+            raise QueueFullError()
+        set_gauge("service.queue_depth", self.pending)
+        return future
+
+    def _work(self) -> None:
+        while True:
+            future, job = self._jobs.get()
+            set_gauge("service.queue_depth", self.pending)
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._active_lock:
+                self._active += 1
+            try:
+                future.set_result(job())
+            except Exception as exc:
+                future.set_exception(exc)
+            finally:
+                with self._active_lock:
+                    self._active -= 1
+
+
+def parse_render_request(body: bytes, query: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+    """Return (cv_data, template_path) from a JSON/YAML request body."""
+    payload = yaml.safe_load(body.decode("utf-8")) if body else None
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON or YAML object.")
+
+    if "data" in payload:
+        data = payload["data"]
+        template_name = payload.get("template")
+    else:
+        data = payload
+        template_name = None
+    template_name = template_name or (query.get("template") or [DEFAULT_TEMPLATE])[0]
+
+    if not isinstance(data, dict) or not data.get("name"):
+        raise ValueError("CV data must be an object with at least a 'name'.")
+    template_path = find_template(str(template_name))
+    if not template_path:
+        raise LookupError(f"Unknown template: {template_name}")
+    return data, template_path
+
+
+class _ChunkChannel:
+    """Bounded per-request pipe: a render worker writes HTML chunks, the handler thread sends them.
+
+    The worker never touches the socket. It gives up (freeing its render slot) once the
+    handler has stopped reading, or when the channel stays full past the job timeout.
+    """
+
+    _END = object()
+
+    def __init__(self, max_chunks: int = STREAM_QUEUE_CHUNKS, put_timeout: float = JOB_TIMEOUT_SECONDS) -> None:
+        self._chunks: "queue.Queue[Any]" = queue.Queue(maxsize=max_chunks)
+        self._closed = threading.Event()
+        self._put_timeout = put_timeout
+
+    def write(self, chunk: bytes) -> int:
+        self._put(bytes(chunk))
+        return len(chunk)
+
+    def finish(self) -> None:
+        """Mark the end of the stream (also after a failed render); a no-op once closed."""
+        try:
+            self._put(self._END)
+        except StreamAbortedError:
+            pass
+
+    def close(self) -> None:
+        self._closed.set()
+
+    def get(self, timeout: float) -> Optional[bytes]:
+        """Next chunk, None at the end of the stream; raises queue.Empty after ``timeout``."""
+        item = self._chunks.get(timeout=max(timeout, 0))
+        return None if item is self._END else item
+
+    def _put(self, item: Any) -> None:
+        deadline = time.monotonic() + self._put_timeout
+        while not self._closed.is_set():
+            try:
+                self._chunks.put(item, timeout=min(0.1, max(deadline - time.monotonic(), 0)))
+                return
+            except queue.Full:
+                if time.monotonic() >= deadline:
+                    break
+        raise StreamAbortedError("The client stopped reading the stream")
+
+
+class _LazyResponseWriter:
+    """File-like sink that sends the 200 headers on the first write, so early failures can still answer 500."""
+
+    def __init__(self, handler: "RenderRequestHandler", content_type: str) -> None:
+        self._handler = handler
+        self._content_type = content_type
+
+    def write(self, chunk: bytes) -> int:
+        handler = self._handler
+        if not handler._response_started:
+            handler._response_started = True
+            handler.send_response(200)
+            handler.send_header("Content-Type", self._content_type)
+            handler.send_header("Connection", "close")
+            handler.end_headers()
+        handler.wfile.write(chunk)
+        return len(chunk)
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    server_version = "CVRenderService/1.0"
+    render_queue: RenderQueue
+    _response_started = False
+
+    def do_GET(self) -> None:
+        path = urlparse(self.path).path
+        if path == "/healthz":
+            self._send_json(200, {
+                "status": "ok",
+                "pending": self.render_queue.pending,
+                "active": self.render_queue.active,
+                "workers": self.render_queue.workers,
+            })
+        elif path == "/metrics":
+            metrics = snapshot()
+            metrics["queue"] = {
+                "pending": self.render_queue.pending,
+                "active": self.render_queue.active,
+                "capacity": self.render_queue.max_pending,
+            }
+            self._send_json(200, metrics)
+        elif path.startswith("/artifacts/"):
+            self._serve_artifact(path[len("/artifacts/"):], parse_qs(urlparse(self.path).query))
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        profile = (query.get("profile") or [DEFAULT_PROFILE])[0]
+        if profile not in RENDER_PROFILES:
+            self._send_json(400, {"error": f"Unknown render profile: {profile}"})
+            return
+        renderers = {
+            "/render/html": self._render_html,
+            "/render/pdf": functools.partial(self._render_pdf, profile=profile),
+        }
+        renderer = renderers.get(url.path)
+        if renderer is None:
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {"error": "Request body too large"})
+            return
+
+        try:
+            data, template_path = parse_render_request(self.rfile.read(length), query)
+        except LookupError as exc:
+            self._send_json(404, {"error": str(exc)})
+            return
+        except (ValueError, yaml.YAMLError) as exc:
+            self._send_json(400, {"error": str(exc)})
+            return
+
+        increment(f"service.requests{url.path.replace('/', '.')}")
+        try:
+            renderer(data, template_path)
+        except QueueFullError:
+            self._send_json(429, {"error": "Render queue is full, retry later"}, {"Retry-After": "1"})
+        except FutureTimeoutError:
+            if self._response_started:
+                self.close_connection = True
+            else:
+                self._send_json(504, {"error": "Render timed out"})
+        except Exception as exc:
+            logger.exception("Render failed")
+            increment("service.failures")
+            if self._response_started:
+                # Headers are already out; dropping the connection signals the truncated body.
+                self.close_connection = True
+            else:
+                self._send_json(500, {"error": f"Render failed: {exc}"})
+
+    def _render_html(self, data: Dict[str, Any], template_path: str) -> None:
+        """Stream the HTML as Jinja produces it, without a Content-Length.
+
+        A render worker fills a bounded per-request channel and this handler thread
+        writes it to the socket, so the worker never outlives the request and a
+        slow client does not hold a render slot once the document is rendered.
+        """
+        channel = _ChunkChannel()
+
+        def render() -> None:
+            try:
+                with timed("service.render.html"):
+                    stream_html_cv(data, template_path, channel)
+            finally:
+                channel.finish()
+
+        future = self.render_queue.submit(render)
+        writer = _LazyResponseWriter(self, "text/html; charset=utf-8")
+        deadline = time.monotonic() + JOB_TIMEOUT_SECONDS
+        try:
+            while True:
+                try:
+                    chunk = channel.get(deadline - time.monotonic())
+                except queue.Empty:
+                    future.cancel()
+                    raise FutureTimeoutError() from None
+                if chunk is None:
+                    break
+                writer.write(chunk)
+        finally:
+            # Stops a worker still producing (timeout, client gone) at its next write.
+            channel.close()
+        # The end marker is sent from render()'s finally, so the job is about to complete.
+        future.result()
+        self.close_connection = True
+
+    def _render_pdf(self, data: Dict[str, Any], template_path: str, profile: str = DEFAULT_PROFILE) -> None:
+        future = self.render_queue.submit(functools.partial(self._pdf_job, data, template_path, profile))
+        try:
+            result = future.result(timeout=JOB_TIMEOUT_SECONDS)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+        self._send(200, *result)
+
+    @staticmethod
+    def _pdf_job(data: Dict[str, Any], template_path: str, profile: str = DEFAULT_PROFILE) -> Tuple[bytes, str]:
+        with timed(f"service.render.pdf.{profile}"):
+            return render_pdf(render_html(data, template_path), profile=profile), "application/pdf"
+
+    def _serve_artifact(self, key: str, query: Dict[str, Any]) -> None:
+        """Write a stored artifact from its mmap; the bytes never become a Python object."""
+        opened = get_artifact_store().open_mmap(key) if ARTIFACT_KEY_PATTERN.fullmatch(key) else None
+        if opened is None:
+            self._send_json(404, {"error": "Artifact not found"})
+            return
+
+        mapped, mime = opened
+        # Keys are derived from the render input and PDFs are deterministic, so the key is a strong ETag.
+        etag = f'"{key.split(":", 1)[1]}"'
+        if self.headers.get("If-None-Match") == etag:
+            mapped.close()
+            self._response_started = True
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            increment("service.artifacts.not_modified")
+            return
+
+        file_name = os.path.basename((query.get("filename") or [""])[0]).replace('"', "")
+        with mapped, memoryview(mapped) as view:
+            self._response_started = True
+            self.send_response(200)
+            self.send_header("Content-Type", mime)
+            self.send_header("Content-Length", str(len(view)))
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "private, max-age=3600, immutable")
+            if file_name:
+                self.send_header("Content-Disposition", f'attachment; filename="{file_name}"')
+            self.end_headers()
+            self.wfile.write(view)
+        increment("service.artifacts.served")
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json", headers)
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self._response_started = True
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+def create_server(host: str, port: int, workers: int, queue_size: int) -> ThreadingHTTPServer:
+    handler = type("BoundRenderRequestHandler", (RenderRequestHandler,), {
+        "render_queue": RenderQueue(workers, queue_size),
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local CV render service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8601)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="maximum renders running at once")
+    parser.add_argument("--queue-size", type=int, default=16,
+                        help="jobs allowed to wait before answering 429")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    # Template paths are relative to the repository root, like in main.py.
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    server = create_server(args.host, args.port, args.workers, args.queue_size)
+    logger.info("Render service listening on http://%s:%d", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import os
+import time
+
+from utils.artifact_store import ArtifactStore, artifact_key
+
+
+def _orphan(store, name):
+    path = store._blob_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(b"orphan")
+    return path
+
+
+def test_sweep_keeps_orphans_younger_than_the_grace_period(tmp_path):
+    store = ArtifactStore(str(tmp_path), orphan_grace=60)
+    fresh = _orphan(store, "ab" + "0" * 62)
+    stale = _orphan(store, "cd" + "0" * 62)
+    old = time.time() - 120
+    os.utime(stale, (old, old))
+
+    store.evict(sweep=True)
+
+    assert os.path.exists(fresh)
+    assert not os.path.exists(stale)
+
+
+def test_put_rewrites_a_blob_removed_after_the_dedupe_check(tmp_path, monkeypatch):
+    store = ArtifactStore(str(tmp_path))
+    key = artifact_key("pdf", "doc")
+    path = store.put(key, b"%PDF", "application/pdf")
+
+    # Another process sweeps the file right after put() found it on disk.
+    touch = ArtifactStore._touch_blob
+
+    def touch_then_remove(blob_path):
+        found = touch(blob_path)
+        os.remove(blob_path)
+        return found
+
+    monkeypatch.setattr(ArtifactStore, "_touch_blob", staticmethod(touch_then_remove))
+    assert store.put(key, b"%PDF", "application/pdf") == path
+    assert store.read(key) == b"%PDF"
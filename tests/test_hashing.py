@@ -0,0 +1,15 @@
+import datetime
+
+from utils.hashing import content_hash
+
+
+def test_values_of_different_types_hash_differently():
+    day = datetime.date(2024, 5, 1)
+    assert content_hash({"start_date": day}) != content_hash({"start_date": "2024-05-01"})
+    assert content_hash([1]) != content_hash(["1"])
+    assert content_hash({1: "a"}) != content_hash({"1": "a"})
+
+
+def test_key_order_does_not_matter_and_mixed_keys_are_accepted():
+    assert content_hash({"a": 1, "b": [1, 2]}) == content_hash({"b": [1, 2], "a": 1})
+    assert content_hash({1: "int", "1": "str", None: 0}) == content_hash({None: 0, "1": "str", 1: "int"})
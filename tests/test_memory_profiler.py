@@ -0,0 +1,53 @@
+import threading
+import time
+import tracemalloc
+
+from utils import memory_profiler
+
+
+def _enable(monkeypatch):
+    reports = []
+    monkeypatch.setattr(memory_profiler, "MEMORY_PROFILE", True)
+    monkeypatch.setattr(memory_profiler, "write_report", reports.append)
+    return reports
+
+
+def test_memory_trace_leaves_tracemalloc_running_when_someone_else_started_it(monkeypatch):
+    reports = _enable(monkeypatch)
+    tracemalloc.start()
+    try:
+        with memory_profiler.memory_trace("outer"):
+            with memory_profiler.memory_stage("work", note="measured elsewhere"):
+                [bytearray(1024) for _ in range(10)]
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+    assert reports[0].stages[0]["note"] == "measured elsewhere"
+
+
+def test_memory_trace_stops_tracemalloc_it_started(monkeypatch):
+    _enable(monkeypatch)
+    assert not tracemalloc.is_tracing()
+    with memory_profiler.memory_trace("run"):
+        assert tracemalloc.is_tracing()
+    assert not tracemalloc.is_tracing()
+
+
+def test_traced_runs_do_not_overlap(monkeypatch):
+    _enable(monkeypatch)
+    active = []
+    overlaps = []
+
+    def run():
+        with memory_profiler.memory_trace("run"):
+            active.append(1)
+            overlaps.append(len(active))
+            time.sleep(0.02)
+            active.pop()
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overlaps == [1, 1, 1, 1]
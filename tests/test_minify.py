@@ -0,0 +1,60 @@
+import io
+
+from ui.templates import render_html, stream_html_cv
+from utils.minify import HtmlMinifier, minify_html
+
+DOCUMENT = """<!DOCTYPE html>
+<html>
+  <head>
+    <style>
+      body { margin : 0 ; }
+      h1::after { content: " , "; }
+    </style>
+    <!-- a comment with <b>tags</b> inside -->
+  </head>
+  <body>
+    <h1>Hello</h1> <span>world</span>
+    <p>Hello <em>there</em>   world</p>
+    <pre>
+  keep   this
+      exactly
+</pre>
+    <textarea>  a   b  </textarea>
+  </body>
+</html>
+"""
+
+
+def _stream(document, size):
+    minifier = HtmlMinifier()
+    parts = [minifier.feed(document[i:i + size]) for i in range(0, len(document), size)]
+    return "".join(parts) + minifier.close()
+
+
+def test_incremental_minifier_matches_minify_html_for_every_buffer_size():
+    expected = minify_html(DOCUMENT)
+    for size in range(1, len(DOCUMENT) + 1):
+        assert _stream(DOCUMENT, size) == expected, size
+
+
+def test_stream_html_cv_matches_render_html_across_buffer_boundaries(tmp_path):
+    template = tmp_path / "cv.html"
+    template.write_text(
+        "<html><head><style> p { color : red ; } </style></head><body>\n"
+        "  <h1>{{ name }}</h1>\n"
+        "  {% for item in words %}<span>{{ item }}</span> {% endfor %}\n"
+        "  <p>Hello{{ ' world' }}</p>\n"
+        "  <pre>{{ role }}\n   spaced   out\n</pre>\n"
+        "</body></html>\n",
+        encoding="utf-8",
+    )
+    data = {"name": "Jane Doe", "role": "  Engineer  ", "words": ["one", "two", "three"]}
+    expected = render_html(data, str(template))
+    assert "Hello world" in expected
+    assert "   spaced   out" in expected
+
+    for buffer_size in (1, 2, 7, 16, 1024):
+        target = io.BytesIO()
+        written = stream_html_cv(data, str(template), target, buffer_size=buffer_size)
+        assert target.getvalue().decode("utf-8") == expected, buffer_size
+        assert written == len(target.getvalue())
@@ -0,0 +1,102 @@
+import pickle
+
+import pytest
+
+from utils.render_workers import RenderWorkerPool, WorkerUnavailableError
+
+
+class _FakeConn:
+    def __init__(self, send_error=None, answered=True) -> None:
+        self.send_error = send_error
+        self.answered = answered
+
+    def send(self, job) -> None:
+        if self.send_error is not None:
+            raise self.send_error
+
+    def poll(self, timeout) -> bool:
+        return self.answered
+
+    def recv(self):
+        return True, b"%PDF", 0
+
+
+class _FakeWorker:
+    def __init__(self, conn=None) -> None:
+        self.stopped = False
+        self.conn = conn or _FakeConn()
+
+    def stop(self) -> None:
+        self.stopped = True
+
+
+def _pool(monkeypatch, starts):
+    """Pool whose _start_worker() pops results from ``starts`` (an exception is raised)."""
+    def start(self):
+        outcome = starts.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        with self._lock:
+            self._workers.append(outcome)
+        return outcome
+
+    monkeypatch.setattr(RenderWorkerPool, "_start_worker", start)
+    return RenderWorkerPool(1, acquire_timeout=0.1)
+
+
+def test_failed_start_leaves_a_vacant_slot_that_the_next_request_refills(monkeypatch):
+    replacement = _FakeWorker()
+    pool = _pool(monkeypatch, [OSError("boom"), OSError("boom"), replacement])
+
+    assert pool._vacant == 1
+    assert pool._acquire() is replacement
+    assert pool._vacant == 0
+
+
+def test_acquire_raises_instead_of_blocking_when_no_worker_can_start(monkeypatch):
+    pool = _pool(monkeypatch, [OSError("boom")] * 4)
+
+    with pytest.raises(WorkerUnavailableError):
+        pool._acquire()
+    assert pool._vacant == 1
+
+
+def test_recycle_failure_does_not_lose_the_slot(monkeypatch):
+    worker = _FakeWorker()
+    replacement = _FakeWorker()
+    pool = _pool(monkeypatch, [worker, OSError("boom"), OSError("boom"), replacement])
+
+    assert pool._acquire() is worker
+    pool._release(pool._recycle(worker, "jobs"))
+    assert worker.stopped and pool._vacant == 1
+    assert pool._acquire() is replacement
+
+
+def test_acquire_times_out_when_every_worker_is_busy(monkeypatch):
+    pool = _pool(monkeypatch, [_FakeWorker()])
+    pool._acquire()
+
+    with pytest.raises(WorkerUnavailableError):
+        pool._acquire()
+
+
+def test_unexpected_error_recycles_the_worker_and_is_reraised(monkeypatch):
+    worker = _FakeWorker(_FakeConn(send_error=pickle.PicklingError("unpicklable job")))
+    replacement = _FakeWorker()
+    pool = _pool(monkeypatch, [worker, replacement])
+
+    with pytest.raises(pickle.PicklingError):
+        pool.render("<html></html>", {})
+    assert worker.stopped
+    assert pool._acquire() is replacement
+
+
+def test_timeout_recycles_the_worker_once(monkeypatch):
+    worker = _FakeWorker(_FakeConn(answered=False))
+    replacement = _FakeWorker()
+    pool = _pool(monkeypatch, [worker, replacement])
+
+    with pytest.raises(TimeoutError):
+        pool.render("<html></html>", {})
+    assert worker.stopped and pool._vacant == 0
+    assert pool._acquire() is replacement
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from contextlib import nullcontext
 from typing import Any, Dict
 
 import streamlit as st
@@ -15,8 +16,10 @@ from .editor_sections import (
     render_skills,
     render_social_networks,
 )
+from .live_preview import LIVE_PREVIEW_TOGGLE_KEY, render_live_preview
 from .preview import render_cv_preview
 from .templates import generate_html_cv, get_available_templates
+from .warmup import start_warmup
 from .cv_builder import render_cv_builder
 
 
@@ -25,14 +28,26 @@ def render_data_editor(
     example_data: Dict[str, Any],
     callbacks: EditorCallbacks,
 ) -> None:
-    render_personal_info(cv_data, example_data)
-    render_social_networks(cv_data, example_data)
-    render_about_me(cv_data, example_data)
-    render_education(cv_data, example_data)
-    render_experience(cv_data, example_data)
-    render_projects(cv_data, example_data)
-    render_publications(cv_data, example_data)
-    render_skills(cv_data, example_data)
+    live_preview = st.toggle(
+        "Live preview",
+        key=LIVE_PREVIEW_TOGGLE_KEY,
+        help="Show the CV next to the editor. It refreshes with every edit.",
+    )
+    editor_area, preview_area = st.columns([3, 2]) if live_preview else (nullcontext(), None)
+
+    with editor_area:
+        render_personal_info(cv_data, example_data)
+        render_social_networks(cv_data, example_data)
+        render_about_me(cv_data, example_data)
+        render_education(cv_data, example_data)
+        render_experience(cv_data, example_data)
+        render_projects(cv_data, example_data)
+        render_publications(cv_data, example_data)
+        render_skills(cv_data, example_data)
+
+    if preview_area is not None:
+        with preview_area:
+            render_live_preview(cv_data)
 
     st.markdown("---")
     footer_cols = st.columns(2)
@@ -58,4 +73,5 @@ __all__ = [
     "render_cv_builder",
     "get_available_templates",
     "generate_html_cv",
+    "start_warmup",
 ]
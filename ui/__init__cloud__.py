@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from contextlib import nullcontext
 from typing import Any, Dict
 
 import streamlit as st
@@ -18,8 +19,10 @@ from .editor_sections import (
     render_skills,
     render_social_networks,
 )
+from .live_preview import LIVE_PREVIEW_TOGGLE_KEY, render_live_preview
 from .preview import render_cv_preview
 from .templates import generate_html_cv, get_available_templates
+from .warmup import start_warmup
 
 
 def render_data_editor(
@@ -27,14 +30,26 @@ def render_data_editor(
     example_data: Dict[str, Any],
     callbacks: EditorCallbacks,
 ) -> None:
-    render_personal_info(cv_data, example_data)
-    render_social_networks(cv_data, example_data)
-    render_about_me(cv_data, example_data)
-    render_education(cv_data, example_data)
-    render_experience(cv_data, example_data)
-    render_projects(cv_data, example_data)
-    render_publications(cv_data, example_data)
-    render_skills(cv_data, example_data)
+    live_preview = st.toggle(
+        "Live preview",
+        key=LIVE_PREVIEW_TOGGLE_KEY,
+        help="Show the CV next to the editor. It refreshes with every edit.",
+    )
+    editor_area, preview_area = st.columns([3, 2]) if live_preview else (nullcontext(), None)
+
+    with editor_area:
+        render_personal_info(cv_data, example_data)
+        render_social_networks(cv_data, example_data)
+        render_about_me(cv_data, example_data)
+        render_education(cv_data, example_data)
+        render_experience(cv_data, example_data)
+        render_projects(cv_data, example_data)
+        render_publications(cv_data, example_data)
+        render_skills(cv_data, example_data)
+
+    if preview_area is not None:
+        with preview_area:
+            render_live_preview(cv_data)
 
     st.markdown("---")
     col1, col2, col3 = st.columns([1, 1, 1])
@@ -73,4 +88,5 @@ __all__ = [
     "render_cv_builder",
     "get_available_templates",
     "generate_html_cv",
+    "start_warmup",
 ]
\ No newline at end of file
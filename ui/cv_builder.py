@@ -1,8 +1,33 @@
+import functools
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
 import streamlit as st
-from typing import Dict, List, Any
-import markdown
-from weasyprint import HTML
+from . import dependencies
 from .callbacks import EditorCallbacks
+from .downloads import artifact_download_button
+from .pdf_generator import DEFAULT_PROFILE, RENDER_PROFILES, render_pdf_artifact, worker_memory_note
+from .selection import SelectionStore
+from utils.memory_profiler import memory_stage, memory_traced
+from utils.links import parse_markdown_link
+
+BUILDER_SELECTION_KEY = "builder_selection"
+BUILDER_INITIALIZED_KEY = "builder_selection_initialized"
+PERSONAL_FIELDS = ("name", "email", "phone", "location", "role")
+
+SECTION_HEADINGS = {
+    "aboutme": "### About Me\n",
+    "education": "### Education\n",
+    "experience": "### Experience\n",
+    "projects": "### Projects\n",
+    "skills": "### Skills\n",
+    "publications": "### Publications\n",
+}
+
+@functools.lru_cache(maxsize=32)
+def markdown_to_html(content: str) -> str:
+    """Convert builder markdown to HTML, reusing the result while the content is unchanged."""
+    return dependencies.markdown().markdown(content)
+
 def get_section_items(data: Dict[str, Any], section_name: str) -> List[Dict[str, Any]]:
     """Get items for a specific section."""
     sections = data.get("sections", {})
@@ -12,88 +37,78 @@ def get_section_items(data: Dict[str, Any], section_name: str) -> List[Dict[str,
         return sections.get(section_name, [])
     return []
 
-def get_section_content(data: Dict[str, Any], section_name: str, selected_items: List[int] = None) -> str:
-    """Generate markdown content for a specific section."""
+def _render_item_fragment(section_name: str, item: Dict[str, Any]) -> str:
+    """Generate the markdown for a single section item."""
     content = []
-    items = get_section_items(data, section_name)
-    
-    if not items:
-        return ""
-
-    if selected_items is None:
-        selected_items = list(range(len(items)))
-    
     if section_name == "aboutme":
-        content.append("### About Me\n")
-        for i in selected_items:
-            if i < len(items):
-                content.extend([items[i]["content"]])
-        
+        content.append(item["content"])
+
     elif section_name == "education":
-        content.append("### Education\n")
-        for i in selected_items:
-            if i < len(items):
-                edu = items[i]
-                content.append(f"#### {edu['degree']} in {edu['area']}")
-                content.append(f"**{edu['institution']}** <span style='float: right'>{edu['start_date']} – {edu['end_date']}</span>")
-                content.append("")
-                if "highlights" in edu:
-                    for highlight in edu["highlights"]:
-                        content.append(f"- {highlight}")
-                content.append("")
-            
+        content.append(f"#### {item['degree']} in {item['area']}")
+        content.append(f"**{item['institution']}** <span style='float: right'>{item['start_date']} – {item['end_date']}</span>")
+        content.append("")
+        if "highlights" in item:
+            for highlight in item["highlights"]:
+                content.append(f"- {highlight}")
+        content.append("")
+
     elif section_name == "experience":
-        content.append("### Experience\n")
-        for i in selected_items:
-            if i < len(items):
-                exp = items[i]
-                content.append(f"#### {exp['position']}")
-                content.append(f"**{exp['company']}** <span style='float: right'>{exp['start_date']} – {exp['end_date']}</span>")
-                content.append("")
-                if "highlights" in exp:
-                    for highlight in exp["highlights"]:
-                        content.append(f"- {highlight}")
-                content.append("")
-            
+        content.append(f"#### {item['position']}")
+        content.append(f"**{item['company']}** <span style='float: right'>{item['start_date']} – {item['end_date']}</span>")
+        content.append("")
+        if "highlights" in item:
+            for highlight in item["highlights"]:
+                content.append(f"- {highlight}")
+        content.append("")
+
     elif section_name == "projects":
-        content.append("### Projects\n")
-        for i in selected_items:
-            if i < len(items):
-                proj = items[i]
-                if "url" in proj:
-                    content.append(f"#### [{proj['name']}]({proj['url']})")
-                    content.append(f"{proj['start_date']} – {proj['end_date']}")
-                else:
-                    content.append(f"#### {proj['name']}")
-                    content.append(f"{proj['start_date']} – {proj['end_date']}")
-                content.append("")
-                if "highlights" in proj:
-                    for highlight in proj["highlights"]:
-                        content.append(f"- {highlight}")
-                content.append("")
-            
+        if "url" in item:
+            content.append(f"#### [{item['name']}]({item['url']})")
+        else:
+            content.append(f"#### {item['name']}")
+        content.append(f"{item['start_date']} – {item['end_date']}")
+        content.append("")
+        if "highlights" in item:
+            for highlight in item["highlights"]:
+                content.append(f"- {highlight}")
+        content.append("")
+
     elif section_name == "skills":
-        content.append("### Skills\n")
-        for i in selected_items:
-            if i < len(items):
-                skill = items[i]
-                content.append(f"#### {skill['label']}")
-                content.append(skill['details'])
-                content.append("")
-            
+        content.append(f"#### {item['label']}")
+        content.append(item['details'])
+        content.append("")
+
     elif section_name == "publications":
-        content.append("### Publications\n")
-        for i in selected_items:
-            if i < len(items):
-                pub = items[i]
-                content.append(f"#### {pub['title']}")
-                if "authors" in pub:
-                    content.append("Authors: " + ", ".join(pub["authors"]) + "\n")
-                content.append(f"_{pub['venue']}_")
-                content.append("")
-            
+        content.append(f"#### {item['title']}")
+        if "authors" in item:
+            content.append("Authors: " + ", ".join(item["authors"]) + "\n")
+        content.append(f"_{item['venue']}_")
+        content.append("")
+
     return "\n".join(content)
 
+def _join_section(section_name: str, items: List[Dict[str, Any]], selected_items: Optional[Iterable[int]]) -> str:
+    if not items or section_name not in SECTION_HEADINGS:
+        return ""
+    if selected_items is None:
+        selected_items = range(len(items))
+
+    content = [SECTION_HEADINGS[section_name]]
+    content.extend(_render_item_fragment(section_name, items[i]) for i in selected_items if i < len(items))
+    return "\n".join(content)
+
+def get_section_content(data: Dict[str, Any], section_name: str, selected_items: List[int] = None) -> str:
+    """Generate markdown content for a specific section."""
+    return _join_section(section_name, get_section_items(data, section_name), selected_items)
+
+def get_sections_content(data: Dict[str, Any], selections: Mapping[str, Optional[Iterable[int]]]) -> Dict[str, str]:
+    """Generate markdown content for many sections in one pass, keyed by section name."""
+    return {
+        section_name: _join_section(section_name, get_section_items(data, section_name), selected_items)
+        for section_name, selected_items in selections.items()
+    }
+
+@memory_traced("builder")
 def render_cv_builder(data: Dict[str, Any], callbacks: EditorCallbacks) -> None:    
     if not data or not data.get("name"):
         st.warning("No CV data available. Please fill in the Data Editor tab or load example data.")
@@ -132,16 +147,13 @@ def render_cv_builder(data: Dict[str, Any], callbacks: EditorCallbacks) -> None:
         </style>
     """, unsafe_allow_html=True)
     
-    # Initialize personal info and social networks in session state
-    if "personal_info_selected" not in st.session_state:
+    selection = SelectionStore.from_session(BUILDER_SELECTION_KEY)
+    if BUILDER_INITIALIZED_KEY not in st.session_state:
         # Auto-select all available personal info fields on first load in default order
-        personal_fields = ["name", "email", "phone", "location", "role"]
-        st.session_state.personal_info_selected = [
-            field for field in personal_fields if data.get(field, "")
-        ]
-    
-    if "social_networks_selected" not in st.session_state:
-        st.session_state.social_networks_selected = []
+        for field in PERSONAL_FIELDS:
+            if data.get(field, ""):
+                selection.add("personal_info", field)
+        st.session_state[BUILDER_INITIALIZED_KEY] = True
     
     # Available sections
     available_sections = {
@@ -153,14 +165,6 @@ def render_cv_builder(data: Dict[str, Any], callbacks: EditorCallbacks) -> None:
         "Publications": "publications"
     }
     
-    # Initialize session state
-    if "selected_sections" not in st.session_state:
-        st.session_state.selected_sections = []
-        # Auto-add personal_info section if any fields are selected
-        if st.session_state.personal_info_selected:
-            st.session_state.selected_sections.insert(0, "personal_info")
-    if "selected_items" not in st.session_state:
-        st.session_state.selected_items = {}
     if "current_action" not in st.session_state:
         st.session_state.current_action = None
     
@@ -174,33 +178,17 @@ def render_cv_builder(data: Dict[str, Any], callbacks: EditorCallbacks) -> None:
         with st.expander("Personal Information", expanded=True):
             st.markdown("**Select which personal info to include:**")
             
-            # Available personal info fields from data
-            personal_fields = {
-                "name": data.get("name", ""),
-                "email": data.get("email", ""),
-                "phone": data.get("phone", ""),
-                "location": data.get("location", ""),
-                "role": data.get("role", "")
-            }
-            
-            for field, value in personal_fields.items():
+            for field in PERSONAL_FIELDS:
+                value = data.get(field, "")
                 if value:  # Only show fields that have data
                     field_label = field.replace("_", " ").title()
-                    is_selected = field in st.session_state.personal_info_selected
+                    is_selected = selection.contains("personal_info", field)
                     
                     # Create checkbox for each field
                     if st.checkbox(f"{field_label}: {value}", value=is_selected, key=f"personal_{field}"):
-                        if field not in st.session_state.personal_info_selected:
-                            st.session_state.personal_info_selected.append(field)
-                        if "personal_info" not in st.session_state.selected_sections:
-                            st.session_state.selected_sections.insert(0, "personal_info")
+                        selection.add("personal_info", field, position=0)
                     else:
-                        if field in st.session_state.personal_info_selected:
-                            st.session_state.personal_info_selected.remove(field)
-                        # Remove personal_info section if no fields are selected
-                        if not st.session_state.personal_info_selected:
-                            if "personal_info" in st.session_state.selected_sections:
-                                st.session_state.selected_sections.remove("personal_info")
+                        selection.discard("personal_info", field)
         
         # Social Networks Section
         social_networks = data.get("social_networks", [])
@@ -210,20 +198,13 @@ def render_cv_builder(data: Dict[str, Any], callbacks: EditorCallbacks) -> None:
                 
                 for idx, network in enumerate(social_networks):
                     network_label = f"{network.get('network', 'Network')}: {network.get('username', network.get('url', 'Link'))}"
-                    is_selected = idx in st.session_state.social_networks_selected
+                    is_selected = selection.contains("social_networks", idx)
                     
                     if st.checkbox(network_label, value=is_selected, key=f"social_{idx}"):
-                        if idx not in st.session_state.social_networks_selected:
-                            st.session_state.social_networks_selected.append(idx)
-                            if "social_networks" not in st.session_state.selected_sections:
-                                insert_pos = 1 if "personal_info" in st.session_state.selected_sections else 0
-                                st.session_state.selected_sections.insert(insert_pos, "social_networks")
+                        insert_pos = 1 if "personal_info" in selection else 0
+                        selection.add("social_networks", idx, position=insert_pos)
                     else:
-                        if idx in st.session_state.social_networks_selected:
-                            st.session_state.social_networks_selected.remove(idx)
-                            if not st.session_state.social_networks_selected:
-                                if "social_networks" in st.session_state.selected_sections:
-                                    st.session_state.selected_sections.remove("social_networks")
+                        selection.discard("social_networks", idx)
     
         for section_name, section_key in available_sections.items():
             items = get_section_items(data, section_key)
@@ -233,15 +214,10 @@ def render_cv_builder(data: Dict[str, Any], callbacks: EditorCallbacks) -> None:
                         label = item.get('institution', item.get('company', item.get('name',
                                 item.get('label', item.get('title', item.get('content', f'Item {idx + 1}'))))))
                         
-                        if section_key not in st.session_state.selected_sections or \
-                           idx not in st.session_state.selected_items.get(section_key, []):
+                        if not selection.contains(section_key, idx):
                             st.markdown(f'<div class="section-item">', unsafe_allow_html=True)
                             if st.button(f"➕ {label}", key=f"add_{section_key}_{idx}"):
-                                if section_key not in st.session_state.selected_sections:
-                                    st.session_state.selected_sections.append(section_key)
-                                    st.session_state.selected_items[section_key] = []
-                                if section_key in st.session_state.selected_items:
-                                    st.session_state.selected_items[section_key].append(idx)
+                                selection.add(section_key, idx)
                                 st.session_state.current_action = "add_item"
                                 st.rerun()
                             st.markdown('</div>', unsafe_allow_html=True)
@@ -250,7 +226,8 @@ def render_cv_builder(data: Dict[str, Any], callbacks: EditorCallbacks) -> None:
         st.subheader("Selected Items")
         st.markdown('<div class="selected-sections">', unsafe_allow_html=True)
         
-        for i, section in enumerate(st.session_state.selected_sections):
+        selected_sections = selection.sections
+        for i, section in enumerate(selected_sections):
             section_title = ""
             
             if section == "personal_info":
@@ -268,32 +245,24 @@ def render_cv_builder(data: Dict[str, Any], callbacks: EditorCallbacks) -> None:
             
             if i > 0:
                 if cols[1].button("↑", key=f"up_{section}"):
-                    st.session_state.selected_sections[i], st.session_state.selected_sections[i-1] = \
-                        st.session_state.selected_sections[i-1], st.session_state.selected_sections[i]
+                    selection.move_section(section, -1)
                     st.session_state.current_action = "reorder"
                     st.rerun()
             
-            if i < len(st.session_state.selected_sections) - 1:
+            if i < len(selected_sections) - 1:
                 if cols[2].button("↓", key=f"down_{section}"):
-                    st.session_state.selected_sections[i], st.session_state.selected_sections[i+1] = \
-                        st.session_state.selected_sections[i+1], st.session_state.selected_sections[i]
+                    selection.move_section(section, 1)
                     st.session_state.current_action = "reorder"
                     st.rerun()
             
             if cols[3].button("✕", key=f"remove_section_{section}"):
-                st.session_state.selected_sections.remove(section)
-                if section in st.session_state.selected_items:
-                    del st.session_state.selected_items[section]
-                if section == "personal_info":
-                    st.session_state.personal_info_selected = []
-                elif section == "social_networks":
-                    st.session_state.social_networks_selected = []
+                selection.remove_section(section)
                 st.session_state.current_action = "remove_section"
                 st.rerun()
             
             if section == "personal_info":
                 # Display selected personal info fields in the order they were selected
-                for field in st.session_state.personal_info_selected:
+                for field in selection.items(section):
                     field_label = field.replace("_", " ").title()
                     value = data.get(field, "")
                     
@@ -302,16 +271,13 @@ def render_cv_builder(data: Dict[str, Any], callbacks: EditorCallbacks) -> None:
                         st.markdown(f"• {field_label}: {value}")
                     with item_cols[1]:
                         if st.button("✕", key=f"remove_personal_{field}"):
-                            st.session_state.personal_info_selected.remove(field)
-                            if not st.session_state.personal_info_selected:
-                                if "personal_info" in st.session_state.selected_sections:
-                                    st.session_state.selected_sections.remove("personal_info")
+                            selection.discard(section, field)
                             st.session_state.current_action = "remove_personal_item"
                             st.rerun()
             
             elif section == "social_networks":
                 social_networks = data.get("social_networks", [])
-                for idx in st.session_state.social_networks_selected:
+                for idx in selection.items(section):
                     if idx < len(social_networks):
                         network = social_networks[idx]
                         network_label = f"{network.get('network', 'Network')}: {network.get('username', network.get('url', 'Link'))}"
@@ -321,35 +287,26 @@ def render_cv_builder(data: Dict[str, Any], callbacks: EditorCallbacks) -> None:
                             st.markdown(f"• {network_label}")
                         with item_cols[1]:
                             if st.button("✕", key=f"remove_social_{idx}"):
-                                st.session_state.social_networks_selected.remove(idx)
-                                if not st.session_state.social_networks_selected:
-                                    if "social_networks" in st.session_state.selected_sections:
-                                        st.session_state.selected_sections.remove("social_networks")
+                                selection.discard(section, idx)
                                 st.session_state.current_action = "remove_social_item"
                                 st.rerun()
             
             else:
                 items = get_section_items(data, section)
-                selected_items = st.session_state.selected_items.get(section, [])
-                
-                if selected_items:
-                    for idx in selected_items:
-                        if idx < len(items):
-                            item = items[idx]
-                            label = item.get('institution', item.get('company', item.get('name',
-                                    item.get('label', item.get('title', item.get('content', f'Item {idx + 1}'))))))
-                            
-                            item_cols = st.columns([7, 1])
-                            with item_cols[0]:
-                                st.markdown(f"• {label}")
-                            with item_cols[1]:
-                                if st.button("✕", key=f"remove_item_{section}_{idx}"):
-                                    st.session_state.selected_items[section].remove(idx)
-                                    if not st.session_state.selected_items[section]:
-                                        st.session_state.selected_sections.remove(section)
-                                        del st.session_state.selected_items[section]
-                                    st.session_state.current_action = "remove_item"
-                                    st.rerun()
+                for idx in selection.items(section):
+                    if idx < len(items):
+                        item = items[idx]
+                        label = item.get('institution', item.get('company', item.get('name',
+                                item.get('label', item.get('title', item.get('content', f'Item {idx + 1}'))))))
+                        
+                        item_cols = st.columns([7, 1])
+                        with item_cols[0]:
+                            st.markdown(f"• {label}")
+                        with item_cols[1]:
+                            if st.button("✕", key=f"remove_item_{section}_{idx}"):
+                                selection.discard(section, idx)
+                                st.session_state.current_action = "remove_item"
+                                st.rerun()
             
             st.markdown("---")
     
@@ -363,57 +320,56 @@ def render_cv_builder(data: Dict[str, Any], callbacks: EditorCallbacks) -> None:
         preview_tab, md_editor_tab = st.tabs(["Preview", "MD Editor"])
         
         # Generate the default/original markdown content
-        if st.session_state.selected_sections:
+        if selection:
             original_content = ""
             
+            with memory_stage("markdown"):
+                section_markdown = get_sections_content(data, {
+                    section: selection.items(section)
+                    for section in selection.sections
+                    if section not in ("personal_info", "social_networks")
+                })
+            
             # Process sections in order
-            for section in st.session_state.selected_sections:
+            for section in selection.sections:
+                selected_items = selection.items(section)
                 if section == "personal_info":
-                    # Add personal information in the order they were selected
-                    if st.session_state.personal_info_selected:
-                        # Add name if it's selected
-                        if "name" in st.session_state.personal_info_selected:
-                            name = data.get("name", "")
-                            if name:
-                                original_content += f"## {name}\n\n"
+                    # Add name if it's selected
+                    if "name" in selected_items:
+                        name = data.get("name", "")
+                        if name:
+                            original_content += f"## {name}\n\n"
 
-                        if "role" in st.session_state.personal_info_selected:
-                            role = data.get("role", "")
-                            if role:
-                                original_content += f"#### {role}\n\n"
-                        
-                        # Add other contact info in the order they were selected
-                        contact_info = []
-                        for field in st.session_state.personal_info_selected:
-                            if field != "name" and field != "role" and data.get(field):  # Skip name and role as they're already added
-                                contact_info.append(f"{data.get(field)}")
-                        
-                        if contact_info:
-                            original_content += " | ".join(contact_info) + "\n\n"
+                    if "role" in selected_items:
+                        role = data.get("role", "")
+                        if role:
+                            original_content += f"#### {role}\n\n"
+                    
+                    # Add other contact info in the order they were selected
+                    contact_info = []
+                    for field in selected_items:
+                        if field != "name" and field != "role" and data.get(field):  # Skip name and role as they're already added
+                            contact_info.append(f"{data.get(field)}")
+                    
+                    if contact_info:
+                        original_content += " | ".join(contact_info) + "\n\n"
                 
                 elif section == "social_networks":
                     social_networks = data.get("social_networks", [])
-                    if st.session_state.social_networks_selected:
-                        social_links = []
-                        for idx in st.session_state.social_networks_selected:
-                            if idx < len(social_networks):
-                                network = social_networks[idx]
-                                network_name = network.get('network', 'Link')
-                                network_url = network.get('url', '#')
-                                social_links.append(f"[{network_name}]({network_url})")
-                        
-                        if social_links:
-                            original_content += "" + " | ".join(social_links) + "\n\n"
+                    social_links = []
+                    for idx in selected_items:
+                        if idx < len(social_networks):
+                            network = social_networks[idx]
+                            network_name = network.get('network', 'Link')
+                            network_url = parse_markdown_link(network.get('url') or '#')[1]
+                            social_links.append(f"[{network_name}]({network_url})")
+                    
+                    if social_links:
+                        original_content += "" + " | ".join(social_links) + "\n\n"
                 
-                elif section == "aboutme":
-                    selected_items = st.session_state.selected_items.get(section, [])
-                    if selected_items:
-                        original_content += get_section_content(data, section, selected_items) + "\n\n"
                 else:
                     # Add regular section content
-                    selected_items = st.session_state.selected_items.get(section, [])
-                    if selected_items:
-                        original_content += get_section_content(data, section, selected_items) + "\n\n"
+                    original_content += section_markdown[section] + "\n\n"
             
             # Store original content
             st.session_state.original_markdown = original_content
@@ -429,7 +385,8 @@ def render_cv_builder(data: Dict[str, Any], callbacks: EditorCallbacks) -> None:
             
             if preview_content:
                 # Convert markdown to HTML and display preview
-                html = markdown.markdown(preview_content)
+                with memory_stage("markdown_to_html"):
+                    html = markdown_to_html(preview_content)
                 st.markdown(html, unsafe_allow_html=True)
                 
                 # Add download buttons within preview tab
@@ -445,6 +402,13 @@ def render_cv_builder(data: Dict[str, Any], callbacks: EditorCallbacks) -> None:
                     )
                 
                 with dcol2:
+                    pdf_profile = st.radio(
+                        "PDF quality",
+                        list(RENDER_PROFILES),
+                        index=list(RENDER_PROFILES).index(DEFAULT_PROFILE),
+                        horizontal=True,
+                        key="builder_pdf_profile",
+                    )
                     if st.button("Convert to PDF"):
                         try:
                             # Convert markdown to HTML with styling
@@ -527,15 +491,11 @@ def render_cv_builder(data: Dict[str, Any], callbacks: EditorCallbacks) -> None:
                             """
                             
                             # Convert HTML to PDF using WeasyPrint
-                            pdf = HTML(string=html_content).write_pdf()
+                            with memory_stage("pdf", note=worker_memory_note()):
+                                pdf = render_pdf_artifact(html_content, print_css=False, profile=pdf_profile)
                             
                             # Offer the PDF for download
-                            st.download_button(
-                                "Download PDF",
-                                pdf,
-                                file_name="cv.pdf",
-                                mime="application/pdf"
-                            )
+                            artifact_download_button("Download PDF", pdf.key, "cv.pdf", fallback=pdf.data)
                         except Exception as e:
                             st.error(f"Error generating PDF: {str(e)}")
                 st.markdown('</div>', unsafe_allow_html=True)
@@ -545,7 +505,7 @@ def render_cv_builder(data: Dict[str, Any], callbacks: EditorCallbacks) -> None:
             st.markdown('</div>', unsafe_allow_html=True)
         
         with md_editor_tab:
-            if st.session_state.selected_sections:
+            if selection:
                 # Show reset button
                 col_reset, col_spacer = st.columns([1, 3])
                 with col_reset:
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import functools
+import importlib
+from types import ModuleType
+
+from utils.instrumentation import timed
+
+
+@functools.lru_cache(maxsize=None)
+def lazy_import(name: str) -> ModuleType:
+    """Import a heavy dependency on first use and record how long it took."""
+    with timed(f"import.{name}"):
+        return importlib.import_module(name)
+
+
+def weasyprint() -> ModuleType:
+    return lazy_import("weasyprint")
+
+
+def markdown() -> ModuleType:
+    return lazy_import("markdown")
+
+
+def jinja2() -> ModuleType:
+    return lazy_import("jinja2")
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import html
+import logging
+import mimetypes
+import os
+import sqlite3
+from typing import Optional
+from urllib.parse import quote
+
+import streamlit as st
+
+from utils.artifact_store import get_artifact_store
+
+# When set (e.g. http://localhost:8601), downloads link to the render service, which
+# streams the memory-mapped file instead of pushing the bytes through Streamlit.
+ARTIFACT_BASE_URL_ENV = "CV_ARTIFACT_BASE_URL"
+
+logger = logging.getLogger(__name__)
+
+LINK_STYLE = (
+    "display: inline-block; padding: 0.5rem 1rem; background-color: #0066cc; color: white; "
+    "text-decoration: none; border-radius: 4px; font-weight: 500;"
+)
+
+
+def artifact_download_button(
+    label: str,
+    key: str,
+    file_name: str,
+    button_key: Optional[str] = None,
+    fallback: Optional[bytes] = None,
+) -> None:
+    """Offer a stored artifact for download without base64-encoding it into the page.
+
+    ``fallback`` holds the bytes when the artifact store could not keep the file;
+    they are then offered through a plain download button.
+    """
+    if fallback is not None:
+        mime = mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+        st.download_button(label, fallback, file_name=file_name, mime=mime, key=button_key)
+        return
+
+    missing = "The generated file is no longer available. Please generate it again."
+    try:
+        found = get_artifact_store().lookup(key)
+    except (sqlite3.Error, OSError):
+        logger.exception("Artifact store lookup failed")
+        found = None
+    if found is None:
+        st.error(missing)
+        return
+    path, _, mime = found
+
+    base_url = os.environ.get(ARTIFACT_BASE_URL_ENV)
+    if base_url:
+        href = f"{base_url.rstrip('/')}/artifacts/{key}?filename={quote(file_name)}"
+        st.markdown(
+            f'<a href="{html.escape(href)}" download="{html.escape(file_name)}" style="{LINK_STYLE}">{html.escape(label)}</a>',
+            unsafe_allow_html=True,
+        )
+        return
+
+    # Streamlit reads the file once into its media store; no base64 or markdown copies.
+    try:
+        file = open(path, "rb")
+    except OSError:
+        # Removed (evicted or cleaned by another process) since the lookup.
+        logger.exception("Artifact file disappeared: %s", path)
+        st.error(missing)
+        return
+    with file:
+        st.download_button(label, file, file_name=file_name, mime=mime, key=button_key)
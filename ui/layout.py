@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Tuple
+
+from utils.instrumentation import increment
+from utils import page_layout
+
+from .pdf_generator import _inject_print_css, _layout_options, get_render_profile, get_worker_pool, layout_document
+
+logger = logging.getLogger(__name__)
+
+LAYOUT_CACHE_SIZE = 64
+
+_layout_cache: "OrderedDict[str, LayoutReport]" = OrderedDict()
+_layout_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class LayoutReport:
+    """Pagination of a rendered CV, without the PDF bytes."""
+
+    page_count: int
+    # data-section name -> (first page, last page), 1-based
+    section_pages: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+    warnings: Tuple[str, ...] = ()
+
+
+def analyze_layout(html_content: str, print_css: bool = True) -> LayoutReport:
+    """Lay the CV out with WeasyPrint (as the PDF export would) and report its pagination.
+
+    Only ``HTML.render()`` runs; no PDF is serialized. In process the laid-out
+    document is kept for a following PDF export; with PDF worker processes the
+    layout runs in a worker and only the report comes back. Reports are cached
+    on the HTML hash.
+    """
+    document = _inject_print_css(html_content) if print_css else html_content
+    key = hashlib.sha256(document.encode("utf-8")).hexdigest()
+    with _layout_lock:
+        report = _layout_cache.get(key)
+        if report is not None:
+            _layout_cache.move_to_end(key)
+            increment("layout.cache_hits")
+            return report
+
+    increment("layout.cache_misses")
+    pool = get_worker_pool()
+    if pool is not None:
+        page_count, spans, warnings = pool.layout(document, _layout_options(get_render_profile().preset))
+    else:
+        pages = layout_document(document).pages
+        page_count = len(pages)
+        try:
+            spans, warnings = page_layout.section_pages(pages)
+        except Exception:
+            # The box tree is not a public API; keep the page count if it changes shape.
+            logger.exception("Could not inspect the page layout")
+            spans, warnings = {}, []
+    report = LayoutReport(page_count, spans, tuple(warnings))
+
+    with _layout_lock:
+        _layout_cache[key] = report
+        while len(_layout_cache) > LAYOUT_CACHE_SIZE:
+            _layout_cache.popitem(last=False)
+    return report
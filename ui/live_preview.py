@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Tuple
+
+import streamlit as st
+
+from utils.hashing import content_hash
+from utils.instrumentation import increment
+
+from .preview_component import cv_preview
+from .templates import get_available_templates, render_html
+
+LIVE_PREVIEW_TOGGLE_KEY = "live_preview_enabled"
+LIVE_PREVIEW_RENDER_KEY = "live_preview_render"
+
+
+def _render_live(data: Dict[str, Any], template_path: str) -> str:
+    """Return the HTML for ``data``, reusing the last render while nothing changed.
+
+    There is no explicit debounce: Streamlit runs one script run per session at a
+    time and interrupts it when a newer edit arrives, so a render that a newer
+    edit superseded is abandoned by the rerun itself.
+    """
+    key = (template_path, content_hash(data))
+    rendered: Optional[Tuple[Tuple[str, str], str]] = st.session_state.get(LIVE_PREVIEW_RENDER_KEY)
+    if rendered is not None and rendered[0] == key:
+        increment("live_preview.reused")
+        return rendered[1]
+
+    html_content = render_html(data, template_path)
+    st.session_state[LIVE_PREVIEW_RENDER_KEY] = (key, html_content)
+    increment("live_preview.renders")
+    return html_content
+
+
+def render_live_preview(cv_data: Dict[str, Any]) -> None:
+    """Preview column shown next to the Data Editor."""
+    template_paths = {t["name"]: t["path"] for t in get_available_templates()}
+    if not template_paths:
+        st.info("No templates available.")
+        return
+    selected = st.selectbox("Template", list(template_paths), key="live_preview_template")
+
+    if not cv_data.get("name"):
+        st.info("Fill in your name to see the live preview.")
+        return
+
+    try:
+        html_content = _render_live(cv_data, template_paths[selected])
+    except Exception as e:
+        st.error(f"Error generating preview: {e}")
+        return
+    if html_content:
+        cv_preview(html_content, height=800, key="live_preview")
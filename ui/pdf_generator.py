@@ -1,25 +1,110 @@
 from __future__ import annotations
 
+import copy
+import logging
 import os
 import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
 import streamlit as st
-from weasyprint import HTML
 
+from utils.artifact_store import artifact_key, get_artifact_store
+from utils.instrumentation import increment, set_gauge, timed
+from utils.profiler import profile_slow, profiled
+from utils.render_workers import RenderWorkerPool
+
+from . import dependencies
+from .render_gateway import RenderGateway
+
+logger = logging.getLogger(__name__)
+
+PDF_RENDER_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+PRINT_CSS_PATH = os.path.join("templates", "cv_templates", "pdf_base_styles.css")
+DRAFT_CSS_PATH = os.path.join("templates", "cv_templates", "pdf_draft_styles.css")
+
+# Laid-out documents hold the whole box tree, so only a few are kept.
+DOCUMENT_CACHE_SIZE = 4
+
+# write_pdf() options per preset. Fonts are subsetted unless full_fonts is set;
+# "compact" also drops hinting and recompresses/downsamples embedded images.
+PDF_PRESETS: Dict[str, Dict[str, Any]] = {
+    "standard": {},
+    "compact": {"full_fonts": False, "hinting": False, "optimize_images": True, "jpeg_quality": 75, "dpi": 150},
+    "draft": {"full_fonts": False, "hinting": False},
+}
+# Image options are applied while laying out (HTML.render()); write_pdf() ignores them.
+LAYOUT_OPTIONS = ("optimize_images", "jpeg_quality", "dpi")
+# Picks the default render profile (the one using this preset); it never changes what a profile means.
+PDF_PRESET = os.environ.get("CV_PDF_PRESET", "standard")
+# When set, also serialize the "standard" variant to report size before/after the preset.
+PDF_SIZE_AUDIT = bool(os.environ.get("CV_PDF_SIZE_AUDIT"))
+# Byte-identical PDFs for identical input (fixed generator and document id), so the
+# artifact store, ETags and CDNs can dedupe them. CV_PDF_DETERMINISTIC=0 disables.
+# Dates are left alone: WeasyPrint only writes them when the HTML declares them.
+DETERMINISTIC_PDF = os.environ.get("CV_PDF_DETERMINISTIC", "1") != "0"
+DETERMINISTIC_PDF_GENERATOR = "StreamCVBuilder"
+DETERMINISTIC_METADATA = {"generator": DETERMINISTIC_PDF_GENERATOR}
+# Render PDFs in recycled child processes instead of this one (0 = in-process).
+# Workers are replaced after PDF_WORKER_MAX_JOBS renders or above PDF_WORKER_MAX_RSS bytes.
+PDF_WORKER_PROCESSES = int(os.environ.get("CV_PDF_WORKER_PROCESSES", "0"))
+PDF_WORKER_MAX_JOBS = int(os.environ.get("CV_PDF_WORKER_MAX_JOBS", "50"))
+PDF_WORKER_MAX_RSS = int(os.environ.get("CV_PDF_WORKER_MAX_RSS_MB", "512")) * 1024 * 1024
+
+_HREF_ATTRIBUTE = re.compile(r"""(<a\b[^>]*?)\s+href\s*=\s*(?:"[^"]*"|'[^']*'|[^\s>]+)""", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class RenderProfile:
+    """How a PDF is produced: write preset, print stylesheets and hyperlinks."""
+
+    name: str
+    preset: str
+    css_paths: Tuple[str, ...]
+    keep_links: bool = True
 
-def _inject_print_css(html_content: str) -> str:
+
+@dataclass(frozen=True)
+class PdfArtifact:
+    """A rendered PDF: its artifact-store key, plus the bytes when the store could not keep it."""
+
+    key: str
+    data: Optional[bytes] = None
+
+
+# "final" is lossless; "compact" recompresses images for smaller files;
+# "draft" is for iterating: base fonts only, decorations dropped, no link annotations.
+RENDER_PROFILES: Dict[str, RenderProfile] = {
+    "final": RenderProfile("final", "standard", (PRINT_CSS_PATH,)),
+    "compact": RenderProfile("compact", "compact", (PRINT_CSS_PATH,)),
+    "draft": RenderProfile("draft", "draft", (PRINT_CSS_PATH, DRAFT_CSS_PATH), keep_links=False),
+}
+DEFAULT_PROFILE = next((name for name, profile in RENDER_PROFILES.items() if profile.preset == PDF_PRESET), "final")
+
+_pdf_gateways: Dict[str, RenderGateway] = {}
+_gateway_lock = threading.Lock()
+_worker_pool: Optional[RenderWorkerPool] = None
+_document_cache: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+_document_lock = threading.Lock()
+
+
+def _inject_print_css(html_content: str, css_paths: Tuple[str, ...] = (PRINT_CSS_PATH,)) -> str:
     """Inject a compact print CSS into the provided HTML without altering templates.
 
     This keeps the HTML used for preview/download intact, while PDFs use tighter styles.
     """
-    css_path = os.path.join("templates", "cv_templates", "pdf_base_styles.css")
-    if not os.path.exists(css_path):
-        return html_content
-
-    try:
-        with open(css_path, "r", encoding="utf-8") as f:
-            css = f.read()
-    except Exception:
+    stylesheets = []
+    for css_path in css_paths:
+        try:
+            with open(css_path, "r", encoding="utf-8") as f:
+                stylesheets.append(f.read())
+        except Exception:
+            continue
+    if not stylesheets:
         return html_content
+    css = "\n".join(stylesheets)
 
     style_tag = f"\n<style media=\"print\">\n{css}\n</style>\n"
 
@@ -32,19 +117,222 @@ def _inject_print_css(html_content: str) -> str:
         return style_tag + html_content
 
 
-def html_to_pdf_bytes(html_content: str) -> bytes:
+def layout_document(document: str, preset: Optional[str] = None) -> Any:
+    """Lay out the HTML with WeasyPrint, reusing the Document of a recent identical layout.
+
+    The preview's page count and the PDF export of the same HTML share one layout
+    pass; writing the PDF then only serializes the already laid-out pages. The
+    preset's image options take effect here, so Documents are cached per preset.
+    Only used in process: with CV_PDF_WORKER_PROCESSES set, layout and PDF
+    writing both happen in the workers and no Document is held here.
+    """
+    preset = preset or get_render_profile().preset
+    key = (RenderGateway.make_key(document), preset)
+    with _document_lock:
+        rendered = _document_cache.get(key)
+        if rendered is not None:
+            _document_cache.move_to_end(key)
+            increment("layout.document_hits")
+            return rendered
+
+    with timed("render.layout"):
+        rendered = dependencies.weasyprint().HTML(string=document).render(**_layout_options(preset))
+    with _document_lock:
+        _document_cache[key] = rendered
+        while len(_document_cache) > DOCUMENT_CACHE_SIZE:
+            _document_cache.popitem(last=False)
+    return rendered
+
+
+def _with_metadata(rendered: Any, metadata: Dict[str, Any]) -> Any:
+    """Per-call shallow copy of a cached Document with its own metadata.
+
+    Cached Documents are shared across gateway threads, so they are never mutated.
+    """
+    document = copy.copy(rendered)
+    document.metadata = copy.copy(rendered.metadata)
+    for name, value in metadata.items():
+        setattr(document.metadata, name, value)
+    return document
+
+
+def _write_options(preset: str) -> Dict[str, Any]:
+    options = PDF_PRESETS[preset]
+    supported = getattr(dependencies.weasyprint(), "DEFAULT_OPTIONS", None)
+    if supported is None:
+        # WeasyPrint < 59 only knows optimize_size; fonts are always subsetted there.
+        return {"optimize_size": ("fonts", "images")} if options.get("optimize_images") else {}
+    return {name: value for name, value in options.items() if name in supported}
+
+
+def _layout_options(preset: str) -> Dict[str, Any]:
+    return {name: value for name, value in _write_options(preset).items() if name in LAYOUT_OPTIONS}
+
+
+def _deterministic_options(document: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    supported = getattr(dependencies.weasyprint(), "DEFAULT_OPTIONS", {})
+    if "pdf_identifier" in supported:
+        # The /ID is derived from the input instead of being random.
+        options = dict(options, pdf_identifier=RenderGateway.make_key(document)[:32].encode("ascii"))
+    return options
+
+
+def get_worker_pool() -> Optional[RenderWorkerPool]:
+    """Pre-forked PDF worker processes, when CV_PDF_WORKER_PROCESSES is set."""
+    global _worker_pool
+    if PDF_WORKER_PROCESSES <= 0:
+        return None
+    with _gateway_lock:
+        if _worker_pool is None:
+            _worker_pool = RenderWorkerPool(PDF_WORKER_PROCESSES, max_jobs=PDF_WORKER_MAX_JOBS, max_rss_bytes=PDF_WORKER_MAX_RSS)
+        return _worker_pool
+
+
+def worker_memory_note() -> Optional[str]:
+    """Note for memory reports: with PDF worker processes, layout and PDF allocations are not in this process."""
+    if PDF_WORKER_PROCESSES <= 0:
+        return None
+    return "Runs in a PDF worker process (CV_PDF_WORKER_PROCESSES > 0); its allocations are not traced here."
+
+
+def _write_pdf(document: str, preset: str) -> bytes:
+    options = _write_options(preset)
+    # Pinned metadata so identical input gives byte-identical output.
+    metadata = DETERMINISTIC_METADATA if DETERMINISTIC_PDF else None
+    if metadata:
+        options = _deterministic_options(document, options)
+
+    pool = get_worker_pool()
+
+    def write(write_preset: str, write_options: Dict[str, Any]) -> bytes:
+        layout_options = _layout_options(write_preset)
+        if pool is not None:
+            # Profiled inside the worker process, where the render runs.
+            return pool.render(document, write_options, metadata, layout_options)
+        # Runs on the gateway's executor thread, which is the thread profile_slow() samples.
+        with profile_slow("pdf"):
+            laid_out = layout_document(document, write_preset)
+            if metadata:
+                laid_out = _with_metadata(laid_out, metadata)
+            return laid_out.write_pdf(**write_options)
+
+    pdf_bytes = write(preset, options)
+    increment(f"pdf.bytes.{preset}", len(pdf_bytes))
+    set_gauge(f"pdf.size.{preset}", len(pdf_bytes))
+    if PDF_SIZE_AUDIT and preset != "standard":
+        baseline = len(write("standard", {}))
+        set_gauge("pdf.size.before", baseline)
+        set_gauge("pdf.size.after", len(pdf_bytes))
+        increment("pdf.bytes_saved", baseline - len(pdf_bytes))
+    return pdf_bytes
+
+
+def get_pdf_gateway(preset: Optional[str] = None) -> RenderGateway:
+    """Process-wide gateway per preset so identical concurrent PDF requests share one render."""
+    preset = preset or RENDER_PROFILES[DEFAULT_PROFILE].preset
+    if preset not in PDF_PRESETS:
+        raise ValueError(f"Unknown PDF preset: {preset}")
+    with _gateway_lock:
+        gateway = _pdf_gateways.get(preset)
+        if gateway is None:
+            gateway = RenderGateway(
+                lambda document: _write_pdf(document, preset),
+                max_workers=PDF_RENDER_WORKERS,
+                name=f"pdf.{preset}",
+            )
+            _pdf_gateways[preset] = gateway
+        return gateway
+
+
+def get_render_profile(name: Optional[str] = None) -> RenderProfile:
+    profile = RENDER_PROFILES.get(name or DEFAULT_PROFILE)
+    if profile is None:
+        raise ValueError(f"Unknown render profile: {name}")
+    return profile
+
+
+def _pdf_document(html_content: str, print_css: bool, profile: RenderProfile) -> Tuple[str, str]:
+    document = _inject_print_css(html_content, profile.css_paths) if print_css else html_content
+    if not profile.keep_links:
+        document = _HREF_ATTRIBUTE.sub(r"\1", document)
+    mode = "deterministic" if DETERMINISTIC_PDF else "default"
+    return document, artifact_key("pdf", profile.preset, mode, RenderGateway.make_key(document))
+
+
+@profiled("pdf.request")
+def render_pdf(html_content: str, print_css: bool = True, profile: Optional[str] = None) -> bytes:
+    """Convert HTML to PDF (with the print CSS injected by default), raising on failure.
+
+    Finished PDFs are shared through the on-disk artifact store, so other sessions
+    and workers on the host skip the render entirely. ``profile`` is a name from
+    RENDER_PROFILES ("final" unless CV_PDF_PRESET picks another).
+    """
+    render_profile = get_render_profile(profile)
+    document, key = _pdf_document(html_content, print_css, render_profile)
+    try:
+        cached = get_artifact_store().read(key)
+    except Exception:
+        logger.exception("Artifact store lookup failed")
+        cached = None
+    if cached is not None:
+        return cached
+
+    pdf_bytes = get_pdf_gateway(render_profile.preset).render_sync(document)
+    try:
+        get_artifact_store().put(key, pdf_bytes, "application/pdf")
+    except Exception:
+        logger.exception("Artifact store write failed")
+    return pdf_bytes
+
+
+@profiled("pdf.request")
+def render_pdf_artifact(html_content: str, print_css: bool = True, profile: Optional[str] = None) -> PdfArtifact:
+    """Make sure the PDF exists in the artifact store and return its key.
+
+    Downloads are normally served from the stored file, so the caller never holds
+    the PDF bytes. If the store fails (read-only or full disk, broken index), the
+    bytes are returned in memory instead, raising only when rendering itself fails.
+    """
+    render_profile = get_render_profile(profile)
+    document, key = _pdf_document(html_content, print_css, render_profile)
+    try:
+        stored = get_artifact_store().lookup(key) is not None
+    except Exception:
+        logger.exception("Artifact store lookup failed")
+        stored = False
+    if stored:
+        return PdfArtifact(key)
+
+    pdf_bytes = get_pdf_gateway(render_profile.preset).render_sync(document)
+    try:
+        get_artifact_store().put(key, pdf_bytes, "application/pdf")
+    except Exception:
+        logger.exception("Artifact store write failed")
+        return PdfArtifact(key, pdf_bytes)
+    return PdfArtifact(key)
+
+
+def html_to_pdf_bytes(html_content: str, profile: Optional[str] = None) -> bytes:
     """Convert HTML to PDF using WeasyPrint with print-optimized CSS injected.
 
     Args:
         html_content: Complete HTML document with CSS to convert to PDF
+        profile: Render profile name ("final", "compact" or "draft"; DEFAULT_PROFILE when None)
 
     Returns:
         PDF content as bytes, or empty bytes if conversion fails
     """
     try:
-        html_with_print = _inject_print_css(html_content)
-        return HTML(string=html_with_print).write_pdf()
+        return render_pdf(html_content, profile=profile)
     except Exception as e:
         st.error(f"Erro ao gerar PDF: {e}")
         return b""
 
+
+def html_to_pdf_artifact(html_content: str, print_css: bool = True, profile: Optional[str] = None) -> Optional[PdfArtifact]:
+    """Like html_to_pdf_bytes, but returns the stored PDF artifact (None on failure)."""
+    try:
+        return render_pdf_artifact(html_content, print_css, profile)
+    except Exception as e:
+        st.error(f"Erro ao gerar PDF: {e}")
+        return None
@@ -1,15 +1,124 @@
 from __future__ import annotations
 
 import base64
-from typing import Any, Dict
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
 import streamlit as st
 
+from utils.artifact_store import artifact_key, get_artifact_store
+from utils.memory_profiler import memory_stage, memory_traced
+
 from .callbacks import PreviewCallbacks
-from .templates import generate_html_cv, get_available_templates
-from .pdf_generator import html_to_pdf_bytes
+from .selection import TOP_LEVEL_SECTIONS, SelectionProjection
+from .templates import generate_html_cv, get_available_templates, template_version
+from .downloads import artifact_download_button
+from .layout import analyze_layout
+from .pdf_generator import DEFAULT_PROFILE, RENDER_PROFILES, html_to_pdf_artifact, worker_memory_note
+from .preview_component import cv_preview
+
+logger = logging.getLogger(__name__)
+
+RENDER_CACHE_KEY = "preview_render_cache"
+
+
+@dataclass(frozen=True)
+class _SectionSelector:
+    key: str
+    title: str
+    widget_key: str
+    expander_label: str
+    item_key: str
+    label: Callable[[int, Dict[str, Any]], str]
+
+
+_SECTION_SELECTORS = (
+    _SectionSelector("social_networks", "Network", "include_network", "Select specific network items", "net_select",
+                     lambda idx, net: f"{net.get('label', 'Label')}: {net.get('url', 'URL')}"),
+    _SectionSelector("experience", "Experience", "include_experience", "Select specific experiences", "exp_select",
+                     lambda idx, exp: f"{exp.get('position', 'Position')} @ {exp.get('company', 'Company')}"),
+    _SectionSelector("education", "Education", "include_education", "Select specific education", "edu_select",
+                     lambda idx, edu: f"{edu.get('degree', 'Degree')} @ {edu.get('institution', 'Institution')}"),
+    _SectionSelector("projects", "Projects", "include_projects", "Select specific projects", "proj_select",
+                     lambda idx, proj: proj.get('name', f'Project {idx+1}')),
+    _SectionSelector("publications", "Publications", "include_publications", "Select specific publications", "pub_select",
+                     lambda idx, pub: pub.get('title', f'Publication {idx+1}')),
+    _SectionSelector("skills", "Skills", "include_skills", "Select specific skills", "skill_select",
+                     lambda idx, skill: skill.get('label', f'Skill {idx+1}')),
+)
+
+
+def _select_items(selector: _SectionSelector, items: List[Dict[str, Any]]) -> List[int]:
+    if not st.checkbox(f"{selector.title} ({len(items)} items)", value=True, key=selector.widget_key):
+        return []
+    with st.expander(selector.expander_label):
+        # One widget per section instead of one checkbox key per item; numbering keeps labels unique.
+        labels = [f"{idx + 1}. {selector.label(idx, item)}" for idx, item in enumerate(items)]
+        # Streamlit derives the widget ID from the option labels, so editing an item's label
+        # creates a new widget. The selection is remembered by item index under a stable
+        # per-section key and carried over as the new widget's default.
+        state_key = f"{selector.item_key}_indices"
+        remembered = st.session_state.get(state_key)
+        if remembered is None:
+            default = list(range(len(items)))
+        elif remembered[0] == labels:
+            default = remembered[1]
+        else:
+            default = [idx for idx in remembered[2] if idx < len(items)]
+        chosen = st.multiselect(
+            selector.expander_label,
+            labels,
+            default=[labels[idx] for idx in default],
+            key=selector.item_key,
+            label_visibility="collapsed",
+        )
+        selected = sorted(labels.index(label) for label in chosen)
+        st.session_state[state_key] = (labels, default, selected)
+        return selected
+
 
+def _render_projection(projection: SelectionProjection, template_path: str) -> Optional[str]:
+    """Render the projected CV, reusing the last result while selection and data are unchanged."""
+    cache_key = (template_path, projection.fingerprint)
+    cached = st.session_state.get(RENDER_CACHE_KEY)
+    if cached and cached[0] == cache_key:
+        return cached[1]
 
+    store_key = artifact_key("html", template_path, template_version(template_path), projection.fingerprint)
+    try:
+        stored = get_artifact_store().read(store_key)
+    except Exception:
+        logger.exception("Artifact store lookup failed")
+        stored = None
+    if stored is not None:
+        html_content = stored.decode("utf-8")
+    else:
+        html_content = generate_html_cv(projection.view, template_path)
+        if html_content:
+            try:
+                get_artifact_store().put(store_key, html_content.encode("utf-8"), "text/html")
+            except Exception:
+                logger.exception("Artifact store write failed")
+    if html_content:
+        st.session_state[RENDER_CACHE_KEY] = (cache_key, html_content)
+    return html_content
+
+
+def _show_page_fit(html_content: str) -> None:
+    """Show how many PDF pages the CV takes, from a layout pass (no PDF is written)."""
+    try:
+        report = analyze_layout(html_content)
+    except Exception as e:
+        st.caption(f"Page count unavailable: {e}")
+        return
+    plural = "page" if report.page_count == 1 else "pages"
+    st.caption(f"Fits on {report.page_count} {plural} as PDF.")
+    for warning in report.warnings:
+        st.caption(f"⚠️ {warning}")
+
+
+@memory_traced("preview")
 def render_cv_preview(
     cv_data: Dict[str, Any],
     example_data: Dict[str, Any],
@@ -25,109 +134,38 @@ def render_cv_preview(
             st.rerun()
         return
         
-    templates = get_available_templates()
-    template_names = [t["name"] for t in templates]
+    template_paths = {t["name"]: t["path"] for t in get_available_templates()}
     
     col1, col2 = st.columns([1, 3])
     
     with col1:
-        selected_template = st.selectbox("Choose a template", template_names, key="template_selector")
+        selected_template = st.selectbox("Choose a template", list(template_paths), key="template_selector")
+        template_path = template_paths.get(selected_template)
         
         st.markdown("---")
         st.markdown("### Select Content to Include")
         
         sections_data = data_to_use.get("sections", {})
-        network_data = data_to_use.get("social_networks", [])
-        
+
+        selected: Dict[str, Iterable[int]] = {}
         include_aboutme = st.checkbox("About Me", value=bool(sections_data.get("aboutme")), key="include_aboutme")
+        if include_aboutme and sections_data.get("aboutme"):
+            selected["aboutme"] = range(len(sections_data["aboutme"]))
 
-        if network_data:
-            include_network = st.checkbox(f"Network ({len(network_data)} items)", value=True, key="include_network")
-            selected_network_indices = []
-            if include_network:
-                with st.expander("Select specific network items"):
-                    for idx, net in enumerate(network_data):
-                        net_label = f"{net.get('label', 'Label')}: {net.get('url', 'URL')}"
-                        if st.checkbox(net_label, value=True, key=f"net_select_{idx}"):
-                            selected_network_indices.append(idx)
-        else:
-            include_network = False
-            selected_network_indices = []    
-        
-        experience_list = sections_data.get("experience", [])
-        if experience_list:
-            include_experience = st.checkbox(f"Experience ({len(experience_list)} items)", value=True, key="include_experience")
-            selected_experience_indices = []
-            if include_experience:
-                with st.expander("Select specific experiences"):
-                    for idx, exp in enumerate(experience_list):
-                        exp_label = f"{exp.get('position', 'Position')} @ {exp.get('company', 'Company')}"
-                        if st.checkbox(exp_label, value=True, key=f"exp_select_{idx}"):
-                            selected_experience_indices.append(idx)
-        else:
-            include_experience = False
-            selected_experience_indices = []
-        
-        education_list = sections_data.get("education", [])
-        if education_list:
-            include_education = st.checkbox(f"Education ({len(education_list)} items)", value=True, key="include_education")
-            selected_education_indices = []
-            if include_education:
-                with st.expander("Select specific education"):
-                    for idx, edu in enumerate(education_list):
-                        edu_label = f"{edu.get('degree', 'Degree')} @ {edu.get('institution', 'Institution')}"
-                        if st.checkbox(edu_label, value=True, key=f"edu_select_{idx}"):
-                            selected_education_indices.append(idx)
-        else:
-            include_education = False
-            selected_education_indices = []
-        
-        projects_list = sections_data.get("projects", [])
-        if projects_list:
-            include_projects = st.checkbox(f"Projects ({len(projects_list)} items)", value=True, key="include_projects")
-            selected_projects_indices = []
-            if include_projects:
-                with st.expander("Select specific projects"):
-                    for idx, proj in enumerate(projects_list):
-                        proj_label = proj.get('name', f'Project {idx+1}')
-                        if st.checkbox(proj_label, value=True, key=f"proj_select_{idx}"):
-                            selected_projects_indices.append(idx)
-        else:
-            include_projects = False
-            selected_projects_indices = []
-        
-        publications_list = sections_data.get("publications", [])
-        if publications_list:
-            include_publications = st.checkbox(f"Publications ({len(publications_list)} items)", value=True, key="include_publications")
-            selected_publications_indices = []
-            if include_publications:
-                with st.expander("Select specific publications"):
-                    for idx, pub in enumerate(publications_list):
-                        pub_label = pub.get('title', f'Publication {idx+1}')
-                        if st.checkbox(pub_label, value=True, key=f"pub_select_{idx}"):
-                            selected_publications_indices.append(idx)
-        else:
-            include_publications = False
-            selected_publications_indices = []
-        
-        skills_list = sections_data.get("skills", [])
-        if skills_list:
-            include_skills = st.checkbox(f"Skills ({len(skills_list)} items)", value=True, key="include_skills")
-            selected_skills_indices = []
-            if include_skills:
-                with st.expander("Select specific skills"):
-                    for idx, skill in enumerate(skills_list):
-                        skill_label = skill.get('label', f'Skill {idx+1}')
-                        if st.checkbox(skill_label, value=True, key=f"skill_select_{idx}"):
-                            selected_skills_indices.append(idx)
-        else:
-            include_skills = False
-            selected_skills_indices = []
+        for selector in _SECTION_SELECTORS:
+            source = data_to_use if selector.key in TOP_LEVEL_SECTIONS else sections_data
+            items = source.get(selector.key, [])
+            if items:
+                selected[selector.key] = _select_items(selector, items)
+
+        with memory_stage("projection"):
+            projection = SelectionProjection.from_indices(data_to_use, selected)
         
         st.markdown("---")
         
         generate_html = False
         generate_pdf = False
+        pdf_profile = None
         
         if not has_user_data:
             if st.button("Load Example Data", use_container_width=True, type="primary", key="load_example_sidebar"):
@@ -139,70 +177,53 @@ def render_cv_preview(
                 generate_html = st.button("Generate HTML", use_container_width=True, type="primary")
             with col_btn2:
                 generate_pdf = st.button("Generate PDF", use_container_width=True)
+            pdf_profile = st.radio(
+                "PDF quality",
+                list(RENDER_PROFILES),
+                index=list(RENDER_PROFILES).index(DEFAULT_PROFILE),
+                horizontal=True,
+                key="pdf_profile",
+                help="Final keeps full image quality, compact recompresses images for a smaller file, "
+                     "draft uses base fonts and skips decorations and links, for quick checks.",
+            )
     
     with col2:
         st.markdown("<h3 style='text-align: center;'>Template Preview</h3>", unsafe_allow_html=True)
         
-        filtered_data = data_to_use.copy()
-        filtered_sections = {}
-        
-        if include_aboutme and sections_data.get("aboutme"):
-            filtered_sections["aboutme"] = sections_data["aboutme"]
-        
-        if include_network and selected_network_indices:
-            filtered_sections["network"] = [network_data[i] for i in selected_network_indices]
-
-        if include_experience and selected_experience_indices:
-            filtered_sections["experience"] = [experience_list[i] for i in selected_experience_indices]
-        
-        if include_education and selected_education_indices:
-            filtered_sections["education"] = [education_list[i] for i in selected_education_indices]
-        
-        if include_projects and selected_projects_indices:
-            filtered_sections["projects"] = [projects_list[i] for i in selected_projects_indices]
-        
-        if include_publications and selected_publications_indices:
-            filtered_sections["publications"] = [publications_list[i] for i in selected_publications_indices]
-        
-        if include_skills and selected_skills_indices:
-            filtered_sections["skills"] = [skills_list[i] for i in selected_skills_indices]
-        
-        filtered_data["sections"] = filtered_sections
-        
-        template_path = next((t["path"] for t in templates if t["name"] == selected_template), None)
+        html_content = None
         if template_path:
-            html_content = generate_html_cv(filtered_data, template_path)
+            with memory_stage("render_html"):
+                html_content = _render_projection(projection, template_path)
             if html_content:
-                st.components.v1.html(html_content, height=900, scrolling=True)
+                with memory_stage("layout", note=worker_memory_note()):
+                    _show_page_fit(html_content)
+                with memory_stage("preview_component"):
+                    cv_preview(html_content, height=900)
     
     if has_user_data and (generate_html or generate_pdf):
-        template_path = next((t["path"] for t in templates if t["name"] == selected_template), None)
         if not template_path:
             st.error("Template not found!")
             return
             
-        html_content = generate_html_cv(filtered_data, template_path)
         if not html_content:
             st.error("Failed to generate CV!")
             return
         
         if generate_html:
             st.success("HTML generated successfully!")
-            b64_html = base64.b64encode(html_content.encode()).decode()
+            with memory_stage("html_export"):
+                b64_html = base64.b64encode(html_content.encode()).decode()
             st.markdown(
                 f'<a href="data:text/html;base64,{b64_html}" download="cv.html" style="display: inline-block; padding: 0.5rem 1rem; background-color: #0066cc; color: white; text-decoration: none; border-radius: 4px; font-weight: 500;">Download HTML</a>',
                 unsafe_allow_html=True
             )
         
         if generate_pdf:
-            pdf_bytes = html_to_pdf_bytes(html_content)
-            if pdf_bytes:
+            with memory_stage("pdf", note=worker_memory_note()):
+                pdf = html_to_pdf_artifact(html_content, profile=pdf_profile)
+            if pdf:
                 st.success("PDF generated successfully!")
-                b64_pdf = base64.b64encode(pdf_bytes).decode()
-                st.markdown(
-                    f'<a href="data:application/pdf;base64,{b64_pdf}" download="cv.pdf" style="display: inline-block; padding: 0.5rem 1rem; background-color: #0066cc; color: white; text-decoration: none; border-radius: 4px; font-weight: 500;">Download PDF</a>',
-                    unsafe_allow_html=True
-                )
+                artifact_download_button("Download PDF", pdf.key, "cv.pdf", button_key="download_pdf", fallback=pdf.data)
             else:
                 st.error("Failed to convert HTML to PDF. Try a simpler template or export HTML.")
 
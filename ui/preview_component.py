@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import os
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from utils.hashing import content_hash
+from utils.instrumentation import increment
+from utils.minify import hoist_styles
+
+_FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "cv_preview")
+_cv_preview = components.declare_component("cv_preview", path=_FRONTEND_DIR)
+
+
+class _SectionSplitter(HTMLParser):
+    """Find the (start, end) offsets of every top-level element carrying data-section."""
+
+    def __init__(self, html_content: str) -> None:
+        super().__init__(convert_charrefs=False)
+        self._html = html_content
+        # HTMLParser.getpos() counts "\n" only; splitlines() would also break on \r, \x0c, \u2028, ...
+        self._line_offsets = [0]
+        for line in html_content.split("\n"):
+            self._line_offsets.append(self._line_offsets[-1] + len(line) + 1)
+        self.spans: List[Tuple[str, int, int]] = []
+        self._open: Optional[Tuple[str, str, int]] = None
+        self._depth = 0
+
+    def _offset(self) -> int:
+        line, column = self.getpos()
+        return self._line_offsets[line - 1] + column
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if self._open is not None:
+            if tag == self._open[1]:
+                self._depth += 1
+            return
+        section = dict(attrs).get("data-section")
+        if section:
+            self._open = (section, tag, self._offset())
+            self._depth = 1
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._open is None or tag != self._open[1]:
+            return
+        self._depth -= 1
+        if self._depth == 0:
+            name, _, start = self._open
+            end = self._html.index(">", self._offset()) + 1
+            self.spans.append((name, start, end))
+            self._open = None
+
+
+def split_sections(html_content: str) -> Tuple[str, Dict[str, str]]:
+    """Split a rendered CV into a shell (sections replaced by markers) and section fragments."""
+    splitter = _SectionSplitter(html_content)
+    splitter.feed(html_content)
+    splitter.close()
+
+    shell: List[str] = []
+    sections: Dict[str, str] = {}
+    position = 0
+    for name, start, end in splitter.spans:
+        shell.append(html_content[position:start])
+        shell.append(f"<!--section:{name}-->")
+        sections[name] = html_content[start:end]
+        position = end
+    shell.append(html_content[position:])
+    return "".join(shell), sections
+
+
+def cv_preview(html_content: str, height: int = 900, key: str = "cv_preview") -> None:
+    """Show the CV in a component that stays mounted and only receives changed sections.
+
+    The full document is sent on first display, when anything outside the
+    data-section elements changes (template, header) or when the browser asks
+    for a resync; otherwise only the changed section fragments go over the wire.
+    The template's <style> blocks travel separately and only when their hash
+    changes; the browser keeps them between renders.
+    """
+    body, styles, styles_hash = hoist_styles(html_content)
+    shell, sections = split_sections(body)
+    shell_hash = content_hash(shell)
+    section_hashes = {name: content_hash(fragment) for name, fragment in sections.items()}
+
+    state_key = f"{key}_state"
+    state = st.session_state.get(state_key)
+    request = st.session_state.get(key) or {}
+    resync = state is not None and request.get("resync") != state["resync"]
+    full = state is None or resync or state["shell"] != shell_hash
+
+    args: Dict[str, Any] = {"styles_hash": styles_hash, "styles": None}
+    if full:
+        version = (state["version"] + 1) if state else 1
+        args.update(html=body, base=None, version=version, patches={})
+        if state is None or resync or state["styles"] != styles_hash:
+            args["styles"] = styles
+            increment("preview.styles_sent")
+        increment("preview.full_documents")
+    else:
+        changed = {
+            name: sections[name]
+            for name, digest in section_hashes.items()
+            if state["sections"].get(name) != digest
+        }
+        version = state["version"] + 1 if changed else state["version"]
+        args.update(html=None, base=state["version"], version=version, patches=changed)
+        increment("preview.patched_sections", len(changed))
+
+    st.session_state[state_key] = {
+        "shell": shell_hash,
+        "sections": section_hashes,
+        "styles": styles_hash,
+        "version": version,
+        "resync": request.get("resync"),
+    }
+    _cv_preview(height=height, key=key, default=None, **args)
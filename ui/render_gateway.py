@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from utils.instrumentation import increment, set_gauge
+
+
+class RenderGateway:
+    """Coalesce identical in-flight renders ("single-flight") on a background event loop.
+
+    Concurrent requests for the same key await one render; unique renders are
+    dispatched to a thread pool.
+    """
+
+    def __init__(self, render: Callable[[str], bytes], max_workers: int = 2, name: str = "pdf") -> None:
+        self._render = render
+        self._name = name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-render")
+        self._inflight: Dict[str, "asyncio.Future[bytes]"] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+
+    @staticmethod
+    def make_key(content: str) -> str:
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name=f"{self._name}-gateway", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    async def _render_once(self, content: str, key: str) -> bytes:
+        pending = self._inflight.get(key)
+        if pending is None:
+            pending = asyncio.get_running_loop().run_in_executor(self._executor, self._render, content)
+            self._inflight[key] = pending
+            set_gauge(f"gateway.{self._name}.inflight", len(self._inflight))
+            pending.add_done_callback(lambda _: self._forget(key))
+            increment(f"gateway.{self._name}.renders")
+        else:
+            increment(f"gateway.{self._name}.coalesced")
+        # shield() keeps a cancelled waiter from cancelling the render other callers share.
+        return await asyncio.shield(pending)
+
+    def _forget(self, key: str) -> None:
+        self._inflight.pop(key, None)
+        set_gauge(f"gateway.{self._name}.inflight", len(self._inflight))
+
+    async def render(self, content: str, key: Optional[str] = None) -> bytes:
+        """Awaitable render usable from any event loop."""
+        loop = self._ensure_loop()
+        coro = self._render_once(content, key or self.make_key(content))
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def render_sync(self, content: str, key: Optional[str] = None, timeout: Optional[float] = None) -> bytes:
+        """Blocking render for synchronous callers such as Streamlit scripts."""
+        coro = self._render_once(content, key or self.make_key(content))
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result(timeout)
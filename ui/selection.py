@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+import streamlit as st
+
+from utils.hashing import content_hash
+
+# Sections that live at the top level of the CV document instead of under "sections".
+TOP_LEVEL_SECTIONS = ("social_networks",)
+
+
+def indices_to_mask(indices: Iterable[int]) -> int:
+    mask = 0
+    for idx in indices:
+        mask |= 1 << idx
+    return mask
+
+
+def mask_to_indices(mask: int, size: int) -> Tuple[int, ...]:
+    return tuple(idx for idx in range(size) if mask >> idx & 1)
+
+
+class SelectedItems(Sequence):
+    """Read-only view over the selected entries of a section list."""
+
+    __slots__ = ("_items", "_indices")
+
+    def __init__(self, items: Sequence[Any], mask: int) -> None:
+        self._items = items
+        self._indices = mask_to_indices(mask, len(items))
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self._items[idx] for idx in self._indices[position]]
+        return self._items[self._indices[position]]
+
+    def __len__(self) -> int:
+        return len(self._indices)
+
+    def __iter__(self) -> Iterator[Any]:
+        items = self._items
+        for idx in self._indices:
+            yield items[idx]
+
+
+class _ProjectedSections(Mapping):
+    __slots__ = ("_sections", "_masks")
+
+    def __init__(self, sections: Mapping[str, Any], masks: Mapping[str, int]) -> None:
+        self._sections = sections
+        self._masks = {
+            key: mask for key, mask in masks.items()
+            if key not in TOP_LEVEL_SECTIONS and mask and sections.get(key)
+        }
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._masks:
+            raise KeyError(key)
+        return SelectedItems(self._sections[key], self._masks[key])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._masks)
+
+    def __len__(self) -> int:
+        return len(self._masks)
+
+
+class ProjectedDocument(Mapping):
+    """Mapping view of a CV document restricted to the selected items.
+
+    Nothing is copied: lookups resolve against the original data on access.
+    """
+
+    __slots__ = ("_data", "_masks", "_sections")
+
+    def __init__(self, data: Mapping[str, Any], masks: Mapping[str, int]) -> None:
+        self._data = data
+        self._masks = masks
+        self._sections = _ProjectedSections(data.get("sections") or {}, masks)
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "sections":
+            return self._sections
+        if key in TOP_LEVEL_SECTIONS:
+            return SelectedItems(self._data.get(key) or [], self._masks.get(key, 0))
+        return self._data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from (key for key in self._data if key != "sections" and key not in TOP_LEVEL_SECTIONS)
+        yield from TOP_LEVEL_SECTIONS
+        yield "sections"
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class SelectionProjection:
+    """Selection bitmaps per section projected over a CV document."""
+
+    def __init__(self, data: Mapping[str, Any], masks: Mapping[str, int]) -> None:
+        self._data = data
+        self._masks = dict(masks)
+        self._view: Optional[ProjectedDocument] = None
+        self._fingerprint: Optional[str] = None
+
+    @classmethod
+    def from_indices(
+        cls, data: Mapping[str, Any], selected: Mapping[str, Iterable[int]]
+    ) -> "SelectionProjection":
+        return cls(data, {key: indices_to_mask(indices) for key, indices in selected.items()})
+
+    def mask(self, section: str) -> int:
+        return self._masks.get(section, 0)
+
+    @property
+    def view(self) -> ProjectedDocument:
+        if self._view is None:
+            self._view = ProjectedDocument(self._data, self._masks)
+        return self._view
+
+    @property
+    def fingerprint(self) -> str:
+        """Stable hash of the document content and the selection, for cache keys."""
+        if self._fingerprint is None:
+            masks = sorted((key, mask) for key, mask in self._masks.items() if mask)
+            self._fingerprint = content_hash([content_hash(self._data), masks])
+        return self._fingerprint
+
+
+class SelectionStore:
+    """Ordered selection sets per section, kept under a single session key.
+
+    Sections keep their insertion order (which is also the CV order) and a
+    section only exists while it has at least one selected item.
+    """
+
+    __slots__ = ("_sections",)
+
+    def __init__(self) -> None:
+        self._sections: Dict[str, Dict[Hashable, None]] = {}
+
+    @classmethod
+    def from_session(cls, key: str) -> "SelectionStore":
+        store = st.session_state.get(key)
+        if not isinstance(store, cls):
+            store = cls()
+            st.session_state[key] = store
+        return store
+
+    def __contains__(self, section: str) -> bool:
+        return section in self._sections
+
+    def __bool__(self) -> bool:
+        return bool(self._sections)
+
+    @property
+    def sections(self) -> List[str]:
+        return list(self._sections)
+
+    def items(self, section: str) -> List[Hashable]:
+        return list(self._sections.get(section, ()))
+
+    def contains(self, section: str, item: Hashable) -> bool:
+        return item in self._sections.get(section, ())
+
+    def add(self, section: str, item: Hashable, position: Optional[int] = None) -> None:
+        if section not in self._sections:
+            self._insert_section(section, position)
+        self._sections[section][item] = None
+
+    def discard(self, section: str, item: Hashable) -> None:
+        selected = self._sections.get(section)
+        if selected is None:
+            return
+        selected.pop(item, None)
+        if not selected:
+            del self._sections[section]
+
+    def remove_section(self, section: str) -> None:
+        self._sections.pop(section, None)
+
+    def move_section(self, section: str, offset: int) -> None:
+        order = list(self._sections)
+        current = order.index(section)
+        target = current + offset
+        if 0 <= target < len(order):
+            order[current], order[target] = order[target], order[current]
+            self._sections = {key: self._sections[key] for key in order}
+
+    def _insert_section(self, section: str, position: Optional[int]) -> None:
+        if position is None or position >= len(self._sections):
+            self._sections[section] = {}
+            return
+        order = list(self._sections)
+        order.insert(position, section)
+        self._sections = {key: self._sections.get(key, {}) for key in order}
@@ -1,12 +1,21 @@
 from __future__ import annotations
 
+import functools
 import os
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, BinaryIO, Dict, List, Mapping, Optional, Union
 
-import jinja2
 import streamlit as st
 
+from utils.instrumentation import increment, timed
+from utils.links import normalize_document
+from utils.minify import HtmlMinifier, minify_html
+from utils.profiler import profiled
+
+from . import dependencies
+
+STREAM_BUFFER_SIZE = 16 * 1024
+
 
 def get_available_templates() -> List[Dict[str, str]]:
     templates: List[Dict[str, str]] = [
@@ -16,18 +25,105 @@ def get_available_templates() -> List[Dict[str, str]]:
     templates_dir = Path("templates") / "cv_templates"
     if templates_dir.exists():
         for file in sorted(templates_dir.iterdir()):
-            if file.suffix.lower() == ".html" and file.stem.lower() != "standard":
+            # "_"-prefixed files (_base.html, _macros.html) are shared building blocks, not layouts.
+            if file.suffix.lower() == ".html" and file.stem.lower() != "standard" and not file.name.startswith("_"):
                 templates.append({"name": file.stem.capitalize(), "path": str(file)})
 
     return templates
 
 
-def generate_html_cv(data: Dict[str, Any], template_path: str) -> Optional[str]:
+@functools.lru_cache(maxsize=None)
+def get_template_environment(directory: str):
+    """Shared Jinja environment per template directory, so compiled templates are reused."""
+    jinja2 = dependencies.jinja2()
+    env = jinja2.Environment(loader=jinja2.FileSystemLoader(searchpath=directory))
+    return env
+
+
+def file_version(path: str) -> str:
+    """Cheap version tag for a file (mtime and size), used in artifact cache keys."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return "missing"
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def template_version(template_path: str) -> str:
+    """Version of a layout including the shared "_" templates it extends/imports."""
+    directory = os.path.dirname(template_path) or "."
+    try:
+        shared = sorted(name for name in os.listdir(directory) if name.startswith("_") and name.endswith(".html"))
+    except OSError:
+        shared = []
+    return "/".join([file_version(template_path)] + [file_version(os.path.join(directory, name)) for name in shared])
+
+
+def load_template(template_path: str):
+    env = get_template_environment(os.path.dirname(template_path) or ".")
+    return env.get_template(os.path.basename(template_path))
+
+
+def find_template(name: str) -> Optional[str]:
+    """Resolve a template name (case-insensitive) to its path."""
+    wanted = name.strip().lower()
+    return next((t["path"] for t in get_available_templates() if t["name"].lower() == wanted), None)
+
+
+def render_html(data: Mapping[str, Any], template_path: str) -> str:
+    """Render a CV template, raising on failure (for callers outside Streamlit).
+
+    The output is minified (comments, indentation, inline CSS whitespace).
+    """
+    html_content = load_template(template_path).render(**normalize_document(data))
+    minified = minify_html(html_content)
+    increment("render.html.minified_bytes_saved", len(html_content) - len(minified))
+    return minified
+
+
+def _write_text(target: BinaryIO, text: str) -> int:
+    encoded = text.encode("utf-8")
+    if encoded:
+        target.write(encoded)
+    return len(encoded)
+
+
+def stream_html_cv(
+    data: Mapping[str, Any],
+    template_path: str,
+    target: Union[str, "os.PathLike[str]", BinaryIO],
+    buffer_size: int = STREAM_BUFFER_SIZE,
+) -> int:
+    """Render a CV template chunk by chunk into a file path or binary stream (file, socket).
+
+    The full document is never held in memory; returns the number of bytes written.
+    The output is byte-for-byte what render_html() returns: text after the last
+    safe tag boundary of a buffer is carried into the next one.
+    """
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, "wb") as fp:
+            return stream_html_cv(data, template_path, fp, buffer_size)
+
+    written = 0
+    minifier = HtmlMinifier()
+    pending: List[str] = []
+    pending_size = 0
+    with timed("render.html.stream"):
+        for chunk in load_template(template_path).generate(**normalize_document(data)):
+            pending.append(chunk)
+            pending_size += len(chunk)
+            if pending_size >= buffer_size:
+                written += _write_text(target, minifier.feed("".join(pending)))
+                pending, pending_size = [], 0
+        written += _write_text(target, minifier.feed("".join(pending)) + minifier.close())
+    increment("render.html.stream_bytes", written)
+    return written
+
+
+@profiled("html")
+def generate_html_cv(data: Mapping[str, Any], template_path: str) -> Optional[str]:
     try:
-        template_loader = jinja2.FileSystemLoader(searchpath=os.path.dirname(template_path) or ".")
-        template_env = jinja2.Environment(loader=template_loader)
-        template = template_env.get_template(os.path.basename(template_path))
-        return template.render(**data)
+        return render_html(data, template_path)
     except Exception as exc:
         st.error(f"Error generating the CV: {exc}")
         return None
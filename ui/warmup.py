@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import logging
+import threading
+
+from utils.instrumentation import increment, timed
+
+from . import dependencies
+from .templates import get_available_templates, load_template
+
+logger = logging.getLogger(__name__)
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def warm_up() -> None:
+    """Preload heavy modules, compile every CV template and initialise fonts."""
+    with timed("warmup.total"):
+        for name in ("jinja2", "markdown", "weasyprint"):
+            try:
+                dependencies.lazy_import(name)
+            except Exception as exc:  # a missing optional dependency must not break startup
+                logger.warning("Warm-up could not import %s: %s", name, exc)
+
+        with timed("warmup.templates"):
+            for template in get_available_templates():
+                try:
+                    load_template(template["path"])
+                except Exception as exc:
+                    logger.warning("Warm-up could not compile %s: %s", template["path"], exc)
+
+        with timed("warmup.fonts"):
+            try:
+                # Laying out a tiny document initialises fontconfig/pango caches.
+                dependencies.weasyprint().HTML(string="<p>warm-up</p>").render()
+            except Exception as exc:
+                logger.warning("Warm-up could not initialise fonts: %s", exc)
+    increment("warmup.runs")
+
+
+def start_warmup() -> bool:
+    """Run warm_up once per process in a background thread. Returns True when it was started."""
+    global _started
+    with _start_lock:
+        if _started:
+            return False
+        _started = True
+    threading.Thread(target=warm_up, name="cv-warmup", daemon=True).start()
+    return True
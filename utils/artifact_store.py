@@ -0,0 +1,244 @@
+import functools
+import hashlib
+import mmap
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from contextlib import closing
+from typing import Iterator, Optional, Tuple
+
+from utils.instrumentation import increment, set_gauge
+
+DEFAULT_ROOT = os.path.join('data', 'artifacts')
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Sem passar de max_bytes, a limpeza completa corre no máximo uma vez por intervalo.
+DEFAULT_EVICT_INTERVAL_SECONDS = 300
+# Arquivos mais novos que isto não são apagados como órfãos: outro processo pode
+# tê-los acabado de escrever e ainda não ter gravado a entrada no índice.
+DEFAULT_ORPHAN_GRACE_SECONDS = 600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    key TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mime TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+)
+"""
+
+
+ARTIFACT_KEY_PATTERN = re.compile(r"[a-z]+:[0-9a-f]{64}")
+
+
+def artifact_key(kind: str, *parts: str) -> str:
+    """
+    Gera a chave de um artefato a partir do tipo e das partes que o identificam.
+    """
+    return kind + ":" + hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class ArtifactStore:
+    """
+    Armazena artefatos renderizados (HTML/PDF) em disco, endereçados pelo conteúdo.
+
+    Um índice SQLite liga cada chave ao arquivo, tamanho e último acesso; a
+    limpeza remove entradas expiradas (TTL) e, por ordem de uso, o que passar
+    do tamanho total permitido. Vários processos no mesmo host podem partilhar
+    o mesmo diretório.
+    """
+
+    def __init__(
+        self,
+        root: str = DEFAULT_ROOT,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        evict_interval: float = DEFAULT_EVICT_INTERVAL_SECONDS,
+        orphan_grace: float = DEFAULT_ORPHAN_GRACE_SECONDS,
+    ) -> None:
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.evict_interval = evict_interval
+        self.orphan_grace = orphan_grace
+        # Estimativa local do total guardado; é corrigida a cada evict().
+        self._stored_bytes = 0
+        self._last_evict = 0.0
+        self._pending_sweep = False
+        self._index_path = os.path.join(root, 'index.sqlite3')
+        os.makedirs(root, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._index_path, timeout=10)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def _write_blob(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Escreve num temporário e publica com os.replace: quem ler nunca vê um arquivo pela metade.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @staticmethod
+    def _touch_blob(path: str) -> bool:
+        """
+        Renova o mtime de um arquivo existente (protege-o da limpeza de órfãos);
+        devolve False se ele não existe.
+        """
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def put(self, key: str, data: bytes, mime: str) -> str:
+        """
+        Guarda o artefato e devolve o caminho do arquivo.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        new_blob = not self._touch_blob(path)
+        if new_blob:
+            self._write_blob(path, data)
+
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            previous = conn.execute("SELECT digest FROM artifacts WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts (key, digest, size, mime, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, digest, len(data), mime, now, now),
+            )
+        # Outro processo pode ter limpado o arquivo entre a verificação e o registo no índice.
+        if not os.path.exists(path):
+            self._write_blob(path, data)
+        increment("artifacts.writes")
+        if new_blob:
+            self._stored_bytes += len(data)
+        if previous is not None and previous[0] != digest:
+            self._pending_sweep = True
+        if self._stored_bytes > self.max_bytes or now - self._last_evict >= self.evict_interval:
+            self.evict(sweep=self._pending_sweep)
+        return path
+
+    def lookup(self, key: str) -> Optional[Tuple[str, int, str]]:
+        """
+        Devolve (caminho, tamanho, mime) de um artefato válido e atualiza o último acesso.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT digest, size, mime, created FROM artifacts WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[3] > self.ttl_seconds:
+                increment("artifacts.misses")
+                return None
+            path = self._blob_path(row[0])
+            if not os.path.exists(path):
+                conn.execute("DELETE FROM artifacts WHERE key = ?", (key,))
+                increment("artifacts.misses")
+                return None
+            conn.execute("UPDATE artifacts SET last_access = ? WHERE key = ?", (now, key))
+        increment("artifacts.hits")
+        return path, row[1], row[2]
+
+    def open_mmap(self, key: str) -> Optional[Tuple[mmap.mmap, str]]:
+        """
+        Abre o artefato como mmap somente leitura (sem copiar para a memória do
+        Python) e devolve (mmap, mime).
+        """
+        found = self.lookup(key)
+        if found is None or found[1] == 0:
+            return None
+        with open(found[0], 'rb') as file:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ), found[2]
+
+    def read(self, key: str) -> Optional[bytes]:
+        """
+        Lê o artefato inteiro como bytes.
+        """
+        opened = self.open_mmap(key)
+        if opened is None:
+            return None
+        with opened[0] as mapped:
+            return mapped[:]
+
+    def evict(self, sweep: bool = False) -> None:
+        """
+        Remove artefatos expirados e os menos usados até caber em max_bytes.
+
+        Arquivos sem referência só são apagados quando alguma entrada saiu do
+        índice (ou com sweep=True) e se não foram escritos nem reutilizados há
+        orphan_grace segundos. Entradas com o mesmo conteúdo partilham um
+        arquivo, por isso cada digest conta uma só vez no total.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            changes_before = conn.total_changes
+            conn.execute("DELETE FROM artifacts WHERE created < ?", (now - self.ttl_seconds,))
+            total = 0
+            kept = set()
+            for key, digest, size in conn.execute(
+                "SELECT key, digest, size FROM artifacts ORDER BY last_access DESC"
+            ).fetchall():
+                if digest not in kept:
+                    total += size
+                if total > self.max_bytes:
+                    conn.execute("DELETE FROM artifacts WHERE key = ?", (key,))
+                    increment("artifacts.evictions")
+                else:
+                    kept.add(digest)
+            deleted = conn.total_changes - changes_before
+            referenced = {row[0] for row in conn.execute("SELECT DISTINCT digest FROM artifacts")}
+            stored = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM artifacts GROUP BY digest)"
+            ).fetchone()[0]
+        self._stored_bytes = stored
+        self._last_evict = now
+        self._pending_sweep = False
+        set_gauge("artifacts.bytes", stored)
+        if not deleted and not sweep:
+            return
+
+        cutoff = time.time() - self.orphan_grace
+        for digest, path in self._iter_blobs():
+            if digest not in referenced:
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+    def _iter_blobs(self) -> Iterator[Tuple[str, str]]:
+        for prefix in os.listdir(self.root):
+            directory = os.path.join(self.root, prefix)
+            if len(prefix) != 2 or not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if not name.startswith('tmp'):
+                    yield name, os.path.join(directory, name)
+
+
+@functools.lru_cache(maxsize=None)
+def get_artifact_store() -> ArtifactStore:
+    """
+    Store partilhado pelo processo, em data/artifacts.
+    """
+    return ArtifactStore()
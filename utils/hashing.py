@@ -0,0 +1,38 @@
+import hashlib
+import json
+from collections.abc import Mapping, Set
+from typing import Any
+
+
+def _canonical(value: Any) -> Any:
+    """
+    Forma serializável em JSON que guarda o tipo de cada valor.
+
+    Mapas viram {"m": [[chave, valor], ...]} ordenados pela chave já serializada
+    (chaves de tipos diferentes não dão TypeError) e valores fora do JSON viram
+    {"t": tipo, "v": texto}, para uma data e a mesma data em texto não colidirem.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, Mapping):
+        entries = [[_canonical(key), _canonical(item)] for key, item in value.items()]
+        entries.sort(key=lambda entry: _dumps(entry[0]))
+        return {"m": entries}
+    if isinstance(value, Set):
+        return {"t": "set", "v": sorted(_dumps(_canonical(item)) for item in value)}
+    if isinstance(value, (list, tuple)) or (hasattr(value, "__iter__") and not isinstance(value, (bytes, bytearray))):
+        return [_canonical(item) for item in value]
+    return {"t": f"{type(value).__module__}.{type(value).__qualname__}", "v": str(value)}
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def content_hash(value: Any) -> str:
+    """
+    Calcula um hash estável do conteúdo de uma estrutura YAML/JSON.
+
+    Não depende da ordem das chaves e distingue os tipos dos valores (ver _canonical).
+    """
+    return hashlib.sha1(_dumps(_canonical(value)).encode("utf-8")).hexdigest()
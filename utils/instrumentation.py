@@ -0,0 +1,71 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+_lock = threading.Lock()
+_timings: Dict[str, Dict[str, float]] = {}
+_counters: Dict[str, float] = {}
+_gauges: Dict[str, float] = {}
+
+
+def record_timing(name: str, seconds: float) -> None:
+    """
+    Registra a duração de uma operação (contagem, total, máximo e último valor).
+    """
+    with _lock:
+        entry = _timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0})
+        entry["count"] += 1
+        entry["total"] += seconds
+        entry["max"] = max(entry["max"], seconds)
+        entry["last"] = seconds
+
+
+def increment(name: str, value: float = 1) -> None:
+    """
+    Incrementa um contador.
+    """
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name: str, value: float) -> None:
+    """
+    Define o valor atual de um indicador (ex.: tamanho de fila).
+    """
+    with _lock:
+        _gauges[name] = value
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """
+    Mede o tempo do bloco e registra com record_timing.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, time.perf_counter() - start)
+
+
+def snapshot() -> Dict[str, Any]:
+    """
+    Devolve uma cópia de todas as métricas registradas.
+    """
+    with _lock:
+        return {
+            "timings": {name: dict(entry) for name, entry in _timings.items()},
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+        }
+
+
+def reset() -> None:
+    """
+    Limpa todas as métricas.
+    """
+    with _lock:
+        _timings.clear()
+        _counters.clear()
+        _gauges.clear()
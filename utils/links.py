@@ -0,0 +1,96 @@
+import html
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, List, Tuple
+
+from utils.hashing import content_hash
+
+MARKDOWN_LINK = re.compile(r"\[([^\]]+)\]\(([^)\s]+)\)")
+NORMALIZED_CACHE_SIZE = 32
+
+_normalized_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_normalized_lock = threading.Lock()
+
+
+def parse_markdown_link(value: str) -> Tuple[str, str]:
+    """
+    Separa um link markdown "[texto](url)" em (texto, url).
+
+    Valores que não são um link markdown completo são devolvidos como (valor, valor).
+    """
+    value = (value or "").strip()
+    match = MARKDOWN_LINK.fullmatch(value)
+    if match:
+        return match.group(1), match.group(2)
+    return value, value
+
+
+def render_inline_html(text: str) -> str:
+    """
+    Converte texto com links markdown em HTML inline (o restante é escapado).
+    """
+    parts: List[str] = []
+    position = 0
+    for match in MARKDOWN_LINK.finditer(text):
+        parts.append(html.escape(text[position:match.start()], quote=False))
+        parts.append(f'<a href="{html.escape(match.group(2))}">{html.escape(match.group(1), quote=False)}</a>')
+        position = match.end()
+    parts.append(html.escape(text[position:], quote=False))
+    return "".join(parts)
+
+
+def _normalize_item(item: Any) -> Any:
+    if not isinstance(item, Mapping):
+        return item
+    extra: Dict[str, Any] = {}
+    highlights = item.get("highlights")
+    if highlights:
+        extra["highlights_html"] = [render_inline_html(str(h)) for h in highlights if h]
+    if item.get("summary"):
+        extra["summary_html"] = render_inline_html(str(item["summary"]))
+    return {**item, **extra} if extra else item
+
+
+def _normalize_social(social: Any) -> Any:
+    if not isinstance(social, Mapping):
+        return social
+    text, url = parse_markdown_link(str(social.get("url") or ""))
+    return {**social, "href": url, "link_text": social.get("network") or text}
+
+
+def normalize_document(data: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Prepara um CV para renderização: links das redes sociais viram (texto, url) e
+    highlights/summaries ganham versões HTML já renderizadas. A chave antiga
+    "AboutMe" é exposta também como "aboutme".
+
+    O resultado é memorizado pelo hash do documento e não altera os dados originais.
+    """
+    key = content_hash(data)
+    with _normalized_lock:
+        cached = _normalized_cache.get(key)
+        if cached is not None:
+            _normalized_cache.move_to_end(key)
+            return cached
+
+    normalized = dict(data)
+    if data.get("social_networks"):
+        normalized["social_networks"] = [_normalize_social(s) for s in data["social_networks"]]
+    sections = data.get("sections")
+    if sections:
+        normalized["sections"] = {
+            name: [_normalize_item(item) for item in items]
+            if isinstance(items, Sequence) and not isinstance(items, str) else items
+            for name, items in sections.items()
+        }
+        # Dados antigos usavam "AboutMe"; os templates leem só "aboutme".
+        if "AboutMe" in sections and not sections.get("aboutme"):
+            normalized["sections"]["aboutme"] = normalized["sections"]["AboutMe"]
+
+    with _normalized_lock:
+        _normalized_cache[key] = normalized
+        if len(_normalized_cache) > NORMALIZED_CACHE_SIZE:
+            _normalized_cache.popitem(last=False)
+    return normalized
@@ -0,0 +1,189 @@
+import functools
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from utils.instrumentation import increment, set_gauge
+
+logger = logging.getLogger(__name__)
+
+# Snapshots de tracemalloc por etapa; desligado salvo CV_MEMORY_PROFILE=1.
+MEMORY_PROFILE = os.environ.get('CV_MEMORY_PROFILE', '0') == '1'
+MEMORY_PROFILE_DIR = os.environ.get('CV_MEMORY_PROFILE_DIR', os.path.join('data', 'memory'))
+MEMORY_PROFILE_MAX_FILES = int(os.environ.get('CV_MEMORY_PROFILE_MAX_FILES', '50'))
+MEMORY_PROFILE_TOP = int(os.environ.get('CV_MEMORY_PROFILE_TOP', '10'))
+MEMORY_PROFILE_FRAMES = 8
+
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+)
+
+_current: ContextVar[Optional['MemoryTrace']] = ContextVar('memory_trace', default=None)
+# reset_peak() e os snapshots valem para o processo todo: um relatório de cada vez.
+_tracing_lock = threading.Lock()
+_sequence = itertools.count()
+
+
+def _frames(traceback: tracemalloc.Traceback) -> List[str]:
+    # tracemalloc ordena do frame mais antigo para o mais recente; aqui o local da alocação vem primeiro.
+    return [f'{frame.filename}:{frame.lineno}' for frame in reversed(traceback)]
+
+
+class MemoryTrace:
+    """
+    Relatório de memória de uma execução (ex.: um rerun do preview), etapa a etapa.
+
+    Para cada etapa regista o pico acima do início ("peak_bytes"), o que ficou
+    alocado no fim ("retained_bytes") e os locais que mais alocaram. O
+    tracemalloc é global ao processo, por isso memory_trace() só deixa correr um
+    relatório de cada vez; ainda assim entram nos números as alocações de threads
+    sem relatório (ex.: a thread de render do PDF) que correm ao mesmo tempo.
+    """
+
+    def __init__(self, name: str, top: int = MEMORY_PROFILE_TOP) -> None:
+        self.name = name
+        self.top = top
+        self.stages: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def stage(self, name: str, note: Optional[str] = None) -> Iterator[None]:
+        before = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+        start_current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+            growth = [stat for stat in after.compare_to(before, 'traceback') if stat.size_diff > 0]
+            self.stages.append({
+                'stage': name,
+                **({'note': note} if note else {}),
+                'seconds': elapsed,
+                'peak_bytes': max(0, peak - start_current),
+                'retained_bytes': current - start_current,
+                'top_sites': [
+                    {
+                        'site': _frames(stat.traceback)[0],
+                        'traceback': _frames(stat.traceback),
+                        'size_diff': stat.size_diff,
+                        'count_diff': stat.count_diff,
+                    }
+                    for stat in growth[:self.top]
+                ],
+            })
+            set_gauge(f'memory.{self.name}.{name}.peak_bytes', max(0, peak - start_current))
+            set_gauge(f'memory.{self.name}.{name}.retained_bytes', current - start_current)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'pid': os.getpid(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'stages': self.stages,
+        }
+
+
+def _enforce_retention(directory: str, max_files: int) -> None:
+    try:
+        paths = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.json')]
+    except OSError:
+        return
+    paths.sort(key=os.path.getmtime, reverse=True)
+    for path in paths[max_files:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def write_report(trace: MemoryTrace, directory: str = MEMORY_PROFILE_DIR, max_files: int = MEMORY_PROFILE_MAX_FILES) -> str:
+    """
+    Grava o relatório em <directory>/<data>-<nome>-<pid>-<n>.json e devolve o caminho.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{trace.name}-{os.getpid()}-{next(_sequence)}.json")
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(trace.to_dict(), file, indent=2)
+    _enforce_retention(directory, max_files)
+    return path
+
+
+@contextmanager
+def memory_trace(name: str) -> Iterator[Optional[MemoryTrace]]:
+    """
+    Abre um relatório de memória; as etapas marcadas com memory_stage() dentro do bloco entram nele.
+
+    Os blocos de várias sessões correm um de cada vez (ver MemoryTrace). O
+    tracemalloc só é parado no fim se foi este módulo a ligá-lo.
+    Com CV_MEMORY_PROFILE desligado não faz nada (e devolve None).
+    """
+    if not MEMORY_PROFILE or _current.get() is not None:
+        yield None
+        return
+
+    trace = MemoryTrace(name)
+    try:
+        with _tracing_lock:
+            started = not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start(MEMORY_PROFILE_FRAMES)
+            token = _current.set(trace)
+            try:
+                yield trace
+            finally:
+                _current.reset(token)
+                if started:
+                    tracemalloc.stop()
+    finally:
+        if trace.stages:
+            try:
+                write_report(trace)
+                increment('memory.reports')
+            except OSError:
+                logger.exception('Could not write the memory report')
+
+
+@contextmanager
+def memory_stage(name: str, note: Optional[str] = None) -> Iterator[None]:
+    """
+    Marca uma etapa do memory_trace() ativo; fora de um, não faz nada.
+
+    note vai para o relatório da etapa (ex.: trabalho feito noutro processo, que não é medido).
+    """
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    with trace.stage(name, note):
+        yield
+
+
+def memory_traced(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorador equivalente a memory_trace(name); devolve a função intacta quando está desligado.
+    """
+    def decorator(function: Callable[..., Any]) -> Callable[..., Any]:
+        if not MEMORY_PROFILE:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with memory_trace(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
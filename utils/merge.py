@@ -0,0 +1,98 @@
+from typing import Any, Dict, List, Mapping, Optional
+
+LIST_REPLACE = "replace"
+LIST_APPEND = "append"
+LIST_MERGE_BY_KEY = "merge_by_key"
+LIST_STRATEGIES = (LIST_REPLACE, LIST_APPEND, LIST_MERGE_BY_KEY)
+
+# Campo usado para casar itens de cada lista na estratégia merge_by_key.
+DEFAULT_LIST_KEYS: Dict[str, str] = {
+    "social_networks": "network",
+    "education": "institution",
+    "experience": "company",
+    "projects": "name",
+    "publications": "title",
+    "skills": "label",
+}
+
+
+def merge_structures(
+    base: Any,
+    overlay: Any,
+    list_strategy: str = LIST_REPLACE,
+    list_keys: Optional[Mapping[str, str]] = None,
+    _field: Optional[str] = None,
+) -> Any:
+    """
+    Mescla overlay sobre base partilhando as subárvores que não mudam.
+
+    Só os níveis alterados são copiados; o resultado reutiliza objetos de base
+    e de overlay, por isso deve ser tratado como somente leitura.
+    """
+    if list_strategy not in LIST_STRATEGIES:
+        raise ValueError(f"Estratégia de lista desconhecida: {list_strategy}")
+
+    if isinstance(base, dict) and isinstance(overlay, dict):
+        result = None
+        for key, value in overlay.items():
+            if key in base:
+                merged = merge_structures(base[key], value, list_strategy, list_keys, key)
+                if merged is base[key]:
+                    continue
+            else:
+                merged = value
+            if result is None:
+                result = dict(base)
+            result[key] = merged
+        return base if result is None else result
+
+    if isinstance(base, list) and isinstance(overlay, list):
+        if list_strategy == LIST_APPEND:
+            return base + overlay if overlay else base
+        if list_strategy == LIST_MERGE_BY_KEY:
+            item_key = (list_keys if list_keys is not None else DEFAULT_LIST_KEYS).get(_field or "")
+            if item_key:
+                return _merge_list_by_key(base, overlay, item_key, list_strategy, list_keys)
+        return overlay
+
+    if base == overlay and not isinstance(overlay, (dict, list)):
+        return base
+    return overlay
+
+
+def _hashable_key(item: Any, item_key: str) -> Any:
+    value = item.get(item_key) if isinstance(item, dict) else None
+    try:
+        hash(value)
+    except TypeError:
+        # Chaves como listas ou dicionários não servem para casar itens.
+        return None
+    return value
+
+
+def _merge_list_by_key(
+    base: List[Any],
+    overlay: List[Any],
+    item_key: str,
+    list_strategy: str,
+    list_keys: Optional[Mapping[str, str]],
+) -> List[Any]:
+    positions = {}
+    for idx, item in enumerate(base):
+        value = _hashable_key(item, item_key)
+        if value:
+            positions.setdefault(value, idx)
+    result = list(base)
+    changed = False
+    for item in overlay:
+        value = _hashable_key(item, item_key)
+        idx = positions.get(value) if value else None
+        if idx is None:
+            result.append(item)
+            changed = True
+            continue
+        merged = merge_structures(base[idx], item, list_strategy, list_keys)
+        if merged is not base[idx]:
+            result[idx] = merged
+            changed = True
+    return result if changed else base
@@ -0,0 +1,144 @@
+import hashlib
+import re
+from typing import List, Tuple
+
+_PRESERVED = re.compile(r"<(pre|textarea|script)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_STYLE = re.compile(r"<style\b[^>]*>.*?</style\s*>", re.IGNORECASE | re.DOTALL)
+_STYLE_BODY = re.compile(r"(<style\b[^>]*>)(.*?)(</style\s*>)", re.IGNORECASE | re.DOTALL)
+_HTML_COMMENT = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+_CSS_PUNCTUATION = re.compile(r"\s*([{};,])\s*")
+_CSS_STRING = re.compile(r""""(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'""")
+_WHITESPACE = re.compile(r"\s+")
+# Trechos que não podem ser cortados entre dois pedaços de um documento em streaming.
+_BLOCK_START = re.compile(r"<!--|<(pre|textarea|script|style)\b", re.IGNORECASE)
+
+
+def minify_css(css: str) -> str:
+    """
+    Remove comentários e espaços desnecessários de uma folha de estilo.
+
+    Strings (ex.: content: " , ") não são alteradas.
+    """
+    parts: List[str] = []
+    position = 0
+    for match in _CSS_STRING.finditer(css):
+        parts.append(_compact_css(css[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(_compact_css(css[position:]))
+    return "".join(parts).strip()
+
+
+def _compact_css(css: str) -> str:
+    css = _CSS_COMMENT.sub("", css)
+    css = _WHITESPACE.sub(" ", css)
+    return _CSS_PUNCTUATION.sub(r"\1", css).replace(";}", "}")
+
+
+def _minify_markup(markup: str) -> str:
+    markup = _HTML_COMMENT.sub("", markup)
+    # Espaços entre tags viram um só (não zero), para não colar elementos inline.
+    return _WHITESPACE.sub(" ", markup)
+
+
+def minify_html(document: str) -> str:
+    """
+    Compacta o HTML gerado: remove comentários, reduz espaços e minifica os <style>.
+
+    O conteúdo de <pre>, <textarea> e <script> é mantido intacto.
+    """
+    return _minify_document(document).strip()
+
+
+def _minify_document(document: str) -> str:
+    parts: List[str] = []
+    position = 0
+    for match in _PRESERVED.finditer(document):
+        parts.append(_minify_fragment(document[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(_minify_fragment(document[position:]))
+    return "".join(parts)
+
+
+def _minify_fragment(fragment: str) -> str:
+    parts: List[str] = []
+    position = 0
+    for match in _STYLE_BODY.finditer(fragment):
+        parts.append(_minify_markup(fragment[position:match.start()]))
+        parts.append(match.group(1) + minify_css(match.group(2)) + match.group(3))
+        position = match.end()
+    parts.append(_minify_markup(fragment[position:]))
+    return "".join(parts)
+
+
+def _safe_cut(text: str) -> int:
+    """
+    Posição logo após o último ">" onde o texto pode ser cortado sem mudar a minificação.
+
+    Serve o fim de uma tag fora de comentários e blocos preservados, ou o fim de
+    um <pre>/<textarea>/<script>/<style>. O fim de um comentário não serve: ele
+    some e os espaços dos dois lados têm de colapsar juntos.
+    """
+    cut = 0
+    position = 0
+    while True:
+        start = _BLOCK_START.search(text, position)
+        gap_end = len(text) if start is None else start.start()
+        last_tag_end = text.rfind(">", position, gap_end)
+        if last_tag_end >= 0:
+            cut = last_tag_end + 1
+        if start is None:
+            return cut
+        closing = rf"</{start.group(1)}\s*>" if start.group(1) else "-->"
+        end = re.compile(closing, re.IGNORECASE).search(text, start.end())
+        if end is None:
+            return cut
+        if start.group(1):
+            cut = end.end()
+        position = end.end()
+
+
+class HtmlMinifier:
+    """
+    Minifica um documento recebido aos pedaços com o mesmo resultado de minify_html().
+
+    Só é emitido o texto até ao último ">" fora de comentários e blocos
+    preservados; o resto (espaços da fronteira, um <pre> ainda aberto) fica
+    guardado para o pedaço seguinte.
+    """
+
+    def __init__(self) -> None:
+        self._pending = ""
+        self._started = False
+
+    def feed(self, text: str) -> str:
+        self._pending += text
+        cut = _safe_cut(self._pending)
+        if cut <= 0:
+            return ""
+        part, self._pending = self._pending[:cut], self._pending[cut:]
+        return self._emit(_minify_document(part))
+
+    def close(self) -> str:
+        part, self._pending = self._pending, ""
+        return self._emit(_minify_document(part)).rstrip()
+
+    def _emit(self, minified: str) -> str:
+        if not self._started:
+            minified = minified.lstrip()
+            self._started = bool(minified)
+        return minified
+
+
+def hoist_styles(document: str) -> Tuple[str, str, str]:
+    """
+    Separa os blocos <style> do documento.
+
+    Devolve (html sem estilos, estilos, hash dos estilos), para que o cliente
+    guarde o CSS pelo hash e só o receba quando mudar.
+    """
+    styles = "".join(match.group(0) for match in _STYLE.finditer(document))
+    body = _STYLE.sub("", document)
+    return body, styles, hashlib.sha1(styles.encode("utf-8")).hexdigest()
@@ -0,0 +1,41 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+Spans = Dict[str, Tuple[int, int]]
+
+
+def _walk_box(box: Any, section: Optional[str], number: int, page_width: float,
+              spans: Spans, overflowing: Dict[str, int]) -> None:
+    element = getattr(box, 'element', None)
+    section = (element.get('data-section') if element is not None else None) or section
+    if section:
+        first, _ = spans.get(section, (number, number))
+        spans[section] = (first, number)
+        width = getattr(box, 'width', None)
+        if isinstance(width, (int, float)) and box.position_x + box.margin_width() > page_width + 0.5:
+            overflowing.setdefault(section, number)
+    for child in getattr(box, 'children', ()):
+        _walk_box(child, section, number, page_width, spans, overflowing)
+
+
+def section_pages(pages: List[Any]) -> Tuple[Spans, List[str]]:
+    """
+    Percorre as caixas das páginas de um Document do WeasyPrint e devolve, por
+    data-section, (primeira página, última página) e os avisos de paginação.
+
+    Não depende do Streamlit, para correr também nos workers de PDF.
+    """
+    spans: Spans = {}
+    overflowing: Dict[str, int] = {}
+    for number, page in enumerate(pages, start=1):
+        _walk_box(page._page_box, None, number, page.width, spans, overflowing)
+
+    warnings = [
+        f"Section '{name}' is split across pages {first}-{last}."
+        for name, (first, last) in spans.items()
+        if last > first
+    ]
+    warnings.extend(
+        f"Content in section '{name}' overflows the page width on page {number}."
+        for name, number in overflowing.items()
+    )
+    return spans, warnings
@@ -0,0 +1,199 @@
+import functools
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.instrumentation import increment
+
+# Perfil amostrado de chamadas lentas; desligado enquanto CV_PROFILE_THRESHOLD_MS não for definido.
+PROFILE_THRESHOLD_MS = float(os.environ.get('CV_PROFILE_THRESHOLD_MS', '0'))
+PROFILE_INTERVAL_MS = float(os.environ.get('CV_PROFILE_INTERVAL_MS', '5'))
+PROFILE_DIR = os.environ.get('CV_PROFILE_DIR', os.path.join('data', 'profiles'))
+PROFILE_MAX_FILES = int(os.environ.get('CV_PROFILE_MAX_FILES', '50'))
+
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+
+Frame = Tuple[str, str, int]
+
+_sequence = itertools.count()
+
+
+class StackSampler:
+    """
+    Amostra periodicamente a pilha de uma thread (por padrão, a que o cria).
+
+    Cada amostra é contada por pilha completa, da raiz para a folha, o que
+    basta para gerar "collapsed stacks" e perfis do speedscope.
+    """
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS, thread_id: Optional[int] = None) -> None:
+        self.interval = max(interval_ms, 1.0) / 1000
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.stacks: 'Counter[Tuple[Frame, ...]]' = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self) -> 'StackSampler':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack: List[Frame] = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, frame.f_lineno))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+
+def _frame_label(frame: Frame) -> str:
+    name, filename, line = frame
+    return f'{name} ({os.path.basename(filename)}:{line})'
+
+
+def collapsed_stacks(stacks: 'Counter[Tuple[Frame, ...]]') -> str:
+    """
+    Formato "collapsed" (flamegraph.pl, speedscope): uma pilha por linha, frames separados por ';'.
+    """
+    lines = [
+        ';'.join(_frame_label(frame).replace(';', ':') for frame in stack) + f' {count}'
+        for stack, count in stacks.most_common()
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def speedscope_profile(name: str, stacks: 'Counter[Tuple[Frame, ...]]', interval_ms: float, elapsed_ms: float) -> Dict[str, Any]:
+    """
+    Perfil "sampled" do speedscope; cada pilha distinta pesa contagem x intervalo.
+    """
+    frames: List[Dict[str, Any]] = []
+    index: Dict[Frame, int] = {}
+    samples: List[List[int]] = []
+    weights: List[float] = []
+    for stack, count in stacks.most_common():
+        sample = []
+        for frame in stack:
+            if frame not in index:
+                index[frame] = len(frames)
+                frames.append({'name': frame[0], 'file': frame[1], 'line': frame[2]})
+            sample.append(index[frame])
+        samples.append(sample)
+        weights.append(count * interval_ms)
+    return {
+        '$schema': SPEEDSCOPE_SCHEMA,
+        'name': name,
+        'exporter': 'StreamCVBuilder',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': elapsed_ms,
+            'samples': samples,
+            'weights': weights,
+        }],
+    }
+
+
+def _enforce_retention(directory: str, max_files: int) -> None:
+    """
+    Mantém só os max_files perfis mais recentes (cada perfil tem um .collapsed e um .speedscope.json).
+    """
+    try:
+        names = [name[:-len('.collapsed')] for name in os.listdir(directory) if name.endswith('.collapsed')]
+    except OSError:
+        return
+    names.sort(key=lambda name: os.path.getmtime(os.path.join(directory, name + '.collapsed')), reverse=True)
+    for name in names[max_files:]:
+        for suffix in ('.collapsed', '.speedscope.json'):
+            try:
+                os.remove(os.path.join(directory, name + suffix))
+            except OSError:
+                pass
+        increment('profiles.evicted')
+
+
+def write_profile(
+    name: str,
+    stacks: 'Counter[Tuple[Frame, ...]]',
+    interval_ms: float,
+    elapsed_ms: float,
+    directory: str = PROFILE_DIR,
+    max_files: int = PROFILE_MAX_FILES,
+) -> str:
+    """
+    Grava o perfil em <directory>/<data>-<nome>-<ms>ms-<pid>-<n>.{collapsed,speedscope.json}.
+
+    Devolve o caminho base (sem extensão).
+    """
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(
+        directory,
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{elapsed_ms:.0f}ms-{os.getpid()}-{next(_sequence)}",
+    )
+    with open(base + '.speedscope.json', 'w', encoding='utf-8') as file:
+        json.dump(speedscope_profile(name, stacks, interval_ms, elapsed_ms), file)
+    with open(base + '.collapsed', 'w', encoding='utf-8') as file:
+        file.write(collapsed_stacks(stacks))
+    _enforce_retention(directory, max_files)
+    return base
+
+
+@contextmanager
+def profile_slow(name: str, threshold_ms: Optional[float] = None) -> Iterator[None]:
+    """
+    Amostra a pilha da thread atual durante o bloco e grava o perfil se ele passar do limite.
+
+    Sem limite (CV_PROFILE_THRESHOLD_MS vazio ou 0) o bloco corre sem amostragem.
+    """
+    threshold = PROFILE_THRESHOLD_MS if threshold_ms is None else threshold_ms
+    if threshold <= 0:
+        yield
+        return
+
+    sampler = StackSampler().start()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        sampler.stop()
+        if elapsed_ms >= threshold and sampler.stacks:
+            try:
+                write_profile(name, sampler.stacks, sampler.interval * 1000, elapsed_ms)
+                increment('profiles.captured')
+                increment(f'profiles.captured.{name}')
+            except OSError:
+                increment('profiles.write_errors')
+
+
+def profiled(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorador equivalente a profile_slow(name); devolve a função intacta quando o perfil está desligado.
+    """
+    def decorator(function: Callable[..., Any]) -> Callable[..., Any]:
+        if PROFILE_THRESHOLD_MS <= 0:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with profile_slow(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,297 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from multiprocessing.connection import Connection
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.instrumentation import increment, set_gauge
+from utils.page_layout import section_pages
+from utils.profiler import profile_slow
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_MAX_JOBS = 50
+DEFAULT_MAX_RSS_BYTES = 512 * 1024 * 1024
+DEFAULT_MEMORY_LIMIT_BYTES = 2 * 1024 * 1024 * 1024
+DEFAULT_CPU_SECONDS = 60
+DEFAULT_TIMEOUT_SECONDS = 120
+# Tentativas de arrancar um worker antes de o lugar ficar vago até ao próximo pedido.
+START_ATTEMPTS = 2
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerCrashedError(RuntimeError):
+    pass
+
+
+class WorkerUnavailableError(RuntimeError):
+    pass
+
+
+def _current_rss() -> int:
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        if resource is None:
+            return 0
+        # ru_maxrss é o pico (KiB no Linux), não o valor atual, mas serve de teto.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _set_job_cpu_limit(cpu_seconds: int) -> None:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(usage.ru_utime + usage.ru_stime) + cpu_seconds
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    # Só o limite "soft" muda: sem privilégios o "hard" não poderia voltar a subir.
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _worker_main(conn: Connection, memory_limit: int, cpu_seconds: int) -> None:
+    """
+    Laço do processo filho: recebe (tipo, html, opções de layout, opções de escrita, metadados).
+
+    O tipo "pdf" devolve os bytes do PDF; "layout" devolve (páginas, secções, avisos)
+    sem escrever o PDF. A resposta leva também o RSS do processo.
+    """
+    if resource is not None and memory_limit:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard == resource.RLIM_INFINITY or memory_limit < hard:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit, hard))
+
+    import weasyprint
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if job is None:
+            return
+        kind, document, layout_options, options, metadata = job
+        if resource is not None and cpu_seconds:
+            _set_job_cpu_limit(cpu_seconds)
+        try:
+            # O perfil (CV_PROFILE_THRESHOLD_MS) é tirado aqui, no processo que faz o trabalho.
+            with profile_slow(kind):
+                # Opções de imagem (optimize_images, jpeg_quality, dpi) só valem no render().
+                rendered = weasyprint.HTML(string=document).render(**(layout_options or {}))
+                if kind == 'layout':
+                    result = _layout_result(rendered.pages)
+                else:
+                    for name, value in (metadata or {}).items():
+                        setattr(rendered.metadata, name, value)
+                    result = rendered.write_pdf(**options)
+            conn.send((True, result, _current_rss()))
+        except MemoryError:
+            conn.send((False, 'Documento excede o limite de memória do worker.', _current_rss()))
+        except Exception as exc:
+            conn.send((False, f'{type(exc).__name__}: {exc}', _current_rss()))
+
+
+def _layout_result(pages: List[Any]) -> Tuple[int, Dict[str, Tuple[int, int]], List[str]]:
+    try:
+        spans, warnings = section_pages(pages)
+    except Exception:
+        # A árvore de caixas não é API pública; se mudar, fica só o número de páginas.
+        logger.exception('Could not inspect the page layout')
+        spans, warnings = {}, []
+    return len(pages), spans, warnings
+
+
+class _Worker:
+    def __init__(self, context: Any, memory_limit: int, cpu_seconds: int) -> None:
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, memory_limit, cpu_seconds),
+            name='pdf-render-worker',
+            daemon=True,
+        )
+        try:
+            self.process.start()
+        except BaseException:
+            self.conn.close()
+            raise
+        finally:
+            child_conn.close()
+        self.jobs = 0
+        self.rss = 0
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class RenderWorkerPool:
+    """
+    Pool de processos pré-iniciados que paginam e renderizam PDFs com o WeasyPrint.
+
+    Cada worker é reciclado depois de max_jobs trabalhos, quando o RSS passa de
+    max_rss_bytes, ou se morrer ou estourar o tempo. Os limites de memória
+    (RLIMIT_AS) e CPU por trabalho (RLIMIT_CPU) contêm documentos patológicos
+    sem afetar o processo do Streamlit.
+
+    Se um worker não arrancar, o lugar fica vago e volta a ser tentado no
+    pedido seguinte; sem worker livre em acquire_timeout segundos o pedido
+    falha com WorkerUnavailableError em vez de esperar para sempre.
+    """
+
+    def __init__(
+        self,
+        processes: int,
+        max_jobs: int = DEFAULT_MAX_JOBS,
+        max_rss_bytes: int = DEFAULT_MAX_RSS_BYTES,
+        memory_limit_bytes: int = DEFAULT_MEMORY_LIMIT_BYTES,
+        cpu_seconds: int = DEFAULT_CPU_SECONDS,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+        acquire_timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    ) -> None:
+        methods = multiprocessing.get_all_start_methods()
+        # forkserver evita herdar as threads do Streamlit em cada fork.
+        self._context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        self.max_jobs = max_jobs
+        self.max_rss_bytes = max_rss_bytes
+        self.memory_limit_bytes = memory_limit_bytes
+        self.cpu_seconds = cpu_seconds
+        self.timeout = timeout
+        self.acquire_timeout = acquire_timeout
+        self._idle: 'queue.Queue[_Worker]' = queue.Queue()
+        self._workers: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._vacant = 0
+        for _ in range(processes):
+            self._release(self._replacement())
+
+    def _start_worker(self) -> _Worker:
+        worker = _Worker(self._context, self.memory_limit_bytes, self.cpu_seconds)
+        with self._lock:
+            self._workers.append(worker)
+            set_gauge('pdf_workers.alive', len(self._workers))
+        increment('pdf_workers.started')
+        return worker
+
+    def _replacement(self) -> Optional[_Worker]:
+        """
+        Arranca um worker novo; se falhar START_ATTEMPTS vezes, marca o lugar como vago e devolve None.
+        """
+        for attempt in range(START_ATTEMPTS):
+            try:
+                return self._start_worker()
+            except Exception:
+                increment('pdf_workers.start_failures')
+                logger.exception('Could not start a PDF worker (attempt %d of %d)', attempt + 1, START_ATTEMPTS)
+        with self._lock:
+            self._vacant += 1
+            set_gauge('pdf_workers.vacant', self._vacant)
+        return None
+
+    def _release(self, worker: Optional[_Worker]) -> None:
+        if worker is not None:
+            self._idle.put(worker)
+
+    def _refill(self) -> None:
+        with self._lock:
+            vacant, self._vacant = self._vacant, 0
+            set_gauge('pdf_workers.vacant', 0)
+        for _ in range(vacant):
+            self._release(self._replacement())
+
+    def _acquire(self) -> _Worker:
+        self._refill()
+        with self._lock:
+            alive = len(self._workers)
+        if not alive:
+            raise WorkerUnavailableError('Nenhum worker de PDF conseguiu arrancar.')
+        try:
+            return self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            increment('pdf_workers.acquire_timeouts')
+            raise WorkerUnavailableError(
+                f'Nenhum worker de PDF ficou livre em {self.acquire_timeout:.0f}s.'
+            ) from None
+
+    def _recycle(self, worker: _Worker, reason: str) -> Optional[_Worker]:
+        worker.stop()
+        with self._lock:
+            self._workers.remove(worker)
+        increment('pdf_workers.recycled')
+        increment(f'pdf_workers.recycled.{reason}')
+        return self._replacement()
+
+    def render(
+        self,
+        document: str,
+        options: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]] = None,
+        layout_options: Optional[Dict[str, Any]] = None,
+    ) -> bytes:
+        """
+        Renderiza o HTML num worker livre (espera até acquire_timeout por um).
+        """
+        return self._run(self._acquire(), ('pdf', document, layout_options, options, metadata))
+
+    def layout(
+        self,
+        document: str,
+        layout_options: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[int, Dict[str, Tuple[int, int]], List[str]]:
+        """
+        Pagina o HTML num worker livre e devolve (páginas, secções, avisos); o Document fica no worker.
+        """
+        return self._run(self._acquire(), ('layout', document, layout_options, None, None))
+
+    def _run(self, worker: _Worker, job: Tuple[Any, ...]) -> Any:
+        try:
+            worker.conn.send(job)
+            answered = worker.conn.poll(self.timeout)
+            if answered:
+                ok, payload, rss = worker.conn.recv()
+        except (EOFError, OSError):
+            self._release(self._recycle(worker, 'crash'))
+            raise WorkerCrashedError('O worker de PDF terminou durante a renderização (limite de CPU/memória?).')
+        except BaseException:
+            # Job que não serializa, resposta corrompida, interrupção: o estado do pipe
+            # é incerto, então o worker é trocado em vez de voltar ao pool.
+            self._release(self._recycle(worker, 'error'))
+            raise
+        if not answered:
+            self._release(self._recycle(worker, 'timeout'))
+            raise TimeoutError(f'PDF render exceeded {self.timeout:.0f}s')
+
+        worker.jobs += 1
+        worker.rss = rss
+        set_gauge('pdf_workers.last_rss', rss)
+        if worker.jobs >= self.max_jobs:
+            self._release(self._recycle(worker, 'jobs'))
+        elif rss > self.max_rss_bytes:
+            self._release(self._recycle(worker, 'rss'))
+        else:
+            self._release(worker)
+
+        if not ok:
+            raise RuntimeError(payload)
+        return payload
+
+    def close(self) -> None:
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.stop()
+        set_gauge('pdf_workers.alive', 0)
@@ -1,6 +1,18 @@
+import copy
 import yaml
 import os
-from typing import Dict, Any, Union, BinaryIO
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Mapping, Optional, Tuple, Union, BinaryIO
+
+from utils.hashing import content_hash
+from utils.merge import LIST_REPLACE, merge_structures
+
+MERGE_CACHE_SIZE = 64
+
+_example_cache: Optional[Tuple[Optional[float], Dict[str, Any]]] = None
+_merge_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+_merge_lock = threading.Lock()
 
 def load_yaml_file(file_path: str) -> Dict[str, Any]:
     """
@@ -51,27 +63,55 @@ def load_user_data(filename: str = 'user_cv_data.yaml') -> Dict[str, Any]:
     file_path = os.path.join('data', filename)
     return load_yaml_file(file_path)
 
-def merge_with_example(user_data: Dict[str, Any]) -> Dict[str, Any]:
+def _load_example_cached() -> Dict[str, Any]:
+    """
+    Carrega o exemplo uma vez e só volta a ler o arquivo quando ele muda.
+    """
+    global _example_cache
+    example_path = os.path.join('templates', 'example.yaml')
+    try:
+        mtime = os.path.getmtime(example_path)
+    except OSError:
+        mtime = None
+    if _example_cache is None or _example_cache[0] != mtime:
+        _example_cache = (mtime, load_yaml_file(example_path) or {})
+        with _merge_lock:
+            _merge_cache.clear()
+    return _example_cache[1]
+
+def merge_with_example(
+    user_data: Dict[str, Any],
+    list_strategy: str = LIST_REPLACE,
+    list_keys: Optional[Mapping[str, str]] = None,
+) -> Dict[str, Any]:
     """
     Mescla os dados do usuário com o template do exemplo.
+
+    A mescla é feita sobre uma cópia dos dados do usuário, partilha as
+    subárvores inalteradas com o exemplo em cache e é memorizada pelo hash dos
+    dados do usuário. O resultado é partilhado entre chamadas: trate-o como
+    somente leitura (copie antes de editar).
     """
-    example_data = load_example_data()
+    example_data = _load_example_cached()
     
     # Se não há dados do usuário, retorna o exemplo
     if not user_data:
         return example_data
     
-    # Mescla recursivamente
-    def merge_dicts(base: Dict, overlay: Dict) -> Dict:
-        result = base.copy()
-        for key, value in overlay.items():
-            if key in result and isinstance(result[key], dict) and isinstance(value, dict):
-                result[key] = merge_dicts(result[key], value)
-            else:
-                result[key] = value
-        return result
-    
-    return merge_dicts(example_data, user_data)
+    cache_key = (content_hash(user_data), list_strategy, content_hash(list_keys) if list_keys else None)
+    with _merge_lock:
+        cached = _merge_cache.get(cache_key)
+        if cached is not None:
+            _merge_cache.move_to_end(cache_key)
+            return cached
+
+    # Copia a entrada para que alterações posteriores do chamador não mudem o cache
+    merged = merge_structures(example_data, copy.deepcopy(user_data), list_strategy, list_keys)
+    with _merge_lock:
+        _merge_cache[cache_key] = merged
+        if len(_merge_cache) > MERGE_CACHE_SIZE:
+            _merge_cache.popitem(last=False)
+    return merged
 
 def load_yaml_from_file(file: Union[str, BinaryIO]) -> Dict[str, Any]:
     """
@@ -87,6 +127,23 @@ def load_yaml_from_file(file: Union[str, BinaryIO]) -> Dict[str, Any]:
         print(f"Erro ao carregar YAML: {e}")
         return {}
 
+def is_data_empty(data: Any) -> bool:
+    """
+    Indica se os dados não têm nenhum valor preenchido (dicionários aninhados incluídos).
+    """
+    if not data:
+        return True
+    for value in data.values():
+        if isinstance(value, dict):
+            if not is_data_empty(value):
+                return False
+        elif isinstance(value, list):
+            if any(value):
+                return False
+        elif value not in ("", None):
+            return False
+    return True
+
 def dump_yaml_to_string(data: Dict[str, Any]) -> str:
     """
     Converte um dicionário para string YAML.